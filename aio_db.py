@@ -0,0 +1,124 @@
+"""
+Akses MySQL async (aiomysql) untuk view async Flask. Opsional: aktif kalau
+ASYNC_VIEWS=1 dan aiomysql + asgiref terpasang
+
+    pip install aiomysql "flask[async]"
+
+selain itu semua route tetap memakai jalur sync (db.py) seperti biasa.
+
+Flask menjalankan setiap view async di event loop baru milik request itu,
+sedangkan pool aiomysql terikat ke satu loop. Jadi pool hidup di satu event
+loop background per proses; view mengirim coroutine ke sana dan menunggu
+hasilnya lewat asyncio.wrap_future. Query yang tidak saling bergantung
+dijalankan bersamaan dengan asyncio.gather, masing-masing di koneksi sendiri.
+
+SQL-nya sama persis dengan versi sync (builder di queries.py).
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+
+try:
+    import aiomysql
+except ImportError:             # dependensi opsional
+    aiomysql = None
+
+from db import DB_CONFIG, POOL_SIZE, POOL_TIMEOUT, POOL_RECYCLE
+import queries
+
+ENABLED = os.environ.get("ASYNC_VIEWS", "0") == "1"
+
+
+def available():
+    return ENABLED and aiomysql is not None and importlib.util.find_spec("asgiref") is not None
+
+
+# ==========================================
+# POOL DI EVENT LOOP BACKGROUND
+# ==========================================
+class AsyncPool:
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.loop = None
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="aio-db", daemon=True).start()
+            self.pool = asyncio.run_coroutine_threadsafe(aiomysql.create_pool(
+                host=DB_CONFIG["host"],
+                user=DB_CONFIG["user"],
+                password=DB_CONFIG["password"],
+                db=DB_CONFIG["database"],
+                charset="utf8mb4",
+                autocommit=True,
+                minsize=1,
+                maxsize=self.size,
+                pool_recycle=POOL_RECYCLE,
+            ), loop).result(POOL_TIMEOUT)
+            self.loop = loop
+
+    async def _query(self, sql, params, dictionary, one):
+        conn = await asyncio.wait_for(self.pool.acquire(), POOL_TIMEOUT)
+        try:
+            async with conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cur:
+                await cur.execute(sql, params)
+                return await (cur.fetchone() if one else cur.fetchall())
+        finally:
+            self.pool.release(conn)
+
+    async def _submit(self, sql, params, dictionary, one):
+        if self.loop is None:
+            self._start()
+        fut = asyncio.run_coroutine_threadsafe(self._query(sql, params, dictionary, one), self.loop)
+        return await asyncio.wrap_future(fut)
+
+    async def fetchall(self, sql, params=(), dictionary=False):
+        return await self._submit(sql, params, dictionary, False)
+
+    async def fetchone(self, sql, params=(), dictionary=False):
+        return await self._submit(sql, params, dictionary, True)
+
+    def stats(self):
+        if self.pool is None:
+            return {"started": False}
+        return {"started": True, "size": self.pool.size, "free": self.pool.freesize, "max": self.pool.maxsize}
+
+
+_pool = AsyncPool()
+
+
+def get_pool():
+    return _pool
+
+
+# ==========================================
+# QUERY (PADANAN ASYNC queries.py)
+# ==========================================
+async def current_version():
+    row = await _pool.fetchone("SELECT version FROM ledger_version WHERE id = 1")
+    return row[0] if row else 0
+
+
+async def fetch_available_months(version=None):
+    months = queries.cached_months(version)
+    if months is not None:
+        return months
+    rows = await _pool.fetchall(queries.MONTHS_SQL)
+    return queries.remember_months(version, [r[0] for r in rows])
+
+
+async def fetch_stats(ftype, start_date=None, end_date=None, month=None):
+    sql, params = queries.stats_query(ftype, start_date, end_date, month)
+    return queries.stats_result(await _pool.fetchone(sql, params))
+
+
+async def fetch_transactions_page(ftype, start_date=None, end_date=None, month=None,
+                                  cursor=None, limit=queries.PAGE_SIZE):
+    sql, params, limit = queries.page_query(ftype, start_date, end_date, month, cursor, limit)
+    return queries.page_result(await _pool.fetchall(sql, params, dictionary=True), limit)
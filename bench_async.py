@@ -0,0 +1,77 @@
+"""
+Benchmark jalur sync (db.py) vs async (aio_db.py) untuk /stats dan /data.
+
+    ASYNC_VIEWS=1 python bench_async.py            # 200 request, 16 klien paralel
+    ASYNC_VIEWS=1 python bench_async.py 1000 32
+
+Butuh database sungguhan (DB_* env) dan aiomysql + flask[async]. Setiap
+"request" menjalankan query yang sama dengan view-nya: daftar bulan +
+agregat (/stats), daftar bulan + satu halaman (/data). Cache bulan dilewati
+supaya query bulan benar-benar jalan. Jalur async memakai asyncio.run per
+request, sama seperti Flask menjalankan view async. Hasil kedua jalur dicek sama.
+"""
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aio_db
+from queries import fetch_available_months, fetch_stats, fetch_transactions_page
+
+
+def sync_stats():
+    return fetch_available_months(), fetch_stats('all')
+
+
+def sync_data():
+    return fetch_available_months(), fetch_transactions_page('all')
+
+
+def async_stats():
+    async def run():
+        return await asyncio.gather(aio_db.fetch_available_months(), aio_db.fetch_stats('all'))
+    return tuple(asyncio.run(run()))
+
+
+def async_data():
+    async def run():
+        return await asyncio.gather(aio_db.fetch_available_months(), aio_db.fetch_transactions_page('all'))
+    return tuple(asyncio.run(run()))
+
+
+def load(fn, requests, clients):
+    """(request/detik, p50 ms, p95 ms, hasil terakhir) dengan `clients` thread paralel."""
+    def timed(_):
+        t0 = time.perf_counter()
+        result = fn()
+        return time.perf_counter() - t0, result
+
+    fn()        # pemanasan: koneksi pool dibuka dulu
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        samples = list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - t0
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return requests / wall, statistics.median(latencies), p95, samples[-1][1]
+
+
+def main(requests, clients):
+    if not aio_db.available():
+        sys.exit("aio_db tidak aktif: set ASYNC_VIEWS=1 dan pasang aiomysql + flask[async]")
+
+    print(f"{requests} request, {clients} klien paralel\n")
+    print(f"{'route':<8}{'jalur':<8}{'req/s':>10}{'p50':>10}{'p95':>10}")
+    for route, sync_fn, async_fn in (("/stats", sync_stats, async_stats), ("/data", sync_data, async_data)):
+        r_sync = load(sync_fn, requests, clients)
+        r_async = load(async_fn, requests, clients)
+        assert r_sync[3] == r_async[3], route
+        for label, (rps, p50, p95, _) in (("sync", r_sync), ("async", r_async)):
+            print(f"{route:<8}{label:<8}{rps:>10.0f}{p50:>8.1f}ms{p95:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 16)
@@ -0,0 +1,77 @@
+"""
+Benchmark engine kolumnar vs filter_transactions()/calculate_stats().
+
+    python bench_columnar.py            # 1.000.000 baris
+    python bench_columnar.py 200000
+
+Data sintetis, tidak menyentuh database. Hasil kedua jalur dicek sama.
+"""
+import random
+import sys
+import time
+from datetime import timedelta
+
+from columnar import ColumnarLedger
+from main import filter_transactions, calculate_stats
+from models import Transaction
+from queries import local_today
+
+CATS = ["🛍️ Belanja", "🍔 Makan", "💅 Skincare", "🚕 Transport", "🏠 Tagihan", "🐾 Kucing", "✨ Income"]
+
+
+def synthetic(n, years=5, seed=42):
+    rnd = random.Random(seed)
+    last = local_today().toordinal()
+    first = last - 365 * years
+    rows = []
+    for i in range(n):
+        type_ = 'in' if rnd.random() < 0.2 else 'out'
+        rows.append(Transaction(
+            i + 1,
+            rnd.randint(first, last),
+            len(CATS) if type_ == 'in' else rnd.randint(1, len(CATS) - 1),  # category_id = posisi di CATS (1-based)
+            "",
+            rnd.randint(1, 2000) * 1000,
+            type_,
+            "bisnis" if type_ == 'in' else rnd.choice(("pribadi", "bisnis")),
+            rnd.choice(("Sisil", "Fariz")),
+        ))
+    return rows
+
+
+def best_of(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(n):
+    today = local_today()
+    print(f"membuat {n:,} transaksi sintetis...")
+    rows = synthetic(n)
+
+    t0 = time.perf_counter()
+    ledger = ColumnarLedger.from_transactions(rows)
+    print(f"build kolumnar: {time.perf_counter() - t0:.2f}s (sekali per versi ledger)\n")
+
+    cases = [
+        ("all", ('all',)),
+        ("month", ('month', None, None, today.strftime("%Y-%m"))),
+        ("range 1 thn", ('range', str(today - timedelta(days=365)), str(today))),
+        ("today", ('today',)),
+    ]
+
+    print(f"{'filter':<14}{'python':>12}{'numpy':>12}{'speedup':>10}")
+    for label, args in cases:
+        t_py, r_py = best_of(lambda: calculate_stats(filter_transactions(rows, *args)), repeat=3)
+        t_np, r_np = best_of(lambda: ledger.stats(ledger.filter(*args)))
+        assert r_py == r_np, (label, r_py, r_np)
+        print(f"{label:<14}{t_py * 1000:>10.1f}ms{t_np * 1000:>10.1f}ms{t_py / t_np:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
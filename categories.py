@@ -0,0 +1,225 @@
+"""
+Katalog kategori per proses: settings, modal tambah transaksi, validasi
+add_transaction / batch API, import CSV, snapshot delta_sync, dan label
+kategori setiap transaksi memakai peta yang sama.
+
+transactions hanya menyimpan category_id; labelnya dibaca dari peta
+id -> nama di sini saat render. Rename = satu UPDATE baris categories,
+hapus = tandai deleted_at (baris transaksi lama tetap punya label), jadi
+keduanya O(1) berapa pun jumlah transaksinya.
+
+Kunci validitasnya versi ledger (CRUD kategori selalu menaikkan versi dan
+menulis ledger_changes dengan entity_key = id kategori, yang tetap walau
+di-rename):
+  - versi sama dengan yang dipegang katalog -> tanpa query sama sekali;
+    halaman baca sudah punya versinya dari ETag (g.ledger_version)
+  - versi berubah -> hanya perubahan 'category' sejak versi itu yang dibaca
+    dari change log (biasanya kosong kalau yang berubah transaksi)
+  - CRUD kategori di proses ini langsung menerapkan perubahannya sendiri
+    (write-through), sama seperti prefix_index.record_insert
+"""
+import threading
+
+import change_log
+from db import db_cursor
+from ledger import bump_version, request_version, write_through
+
+INCOME_CATEGORY = "✨ Income"
+BACKFILL_BATCH = 5000
+
+
+class CategoryCatalogue:
+    def __init__(self):
+        self.version = None
+        self._labels = {}           # id -> nama (termasuk yang sudah dihapus)
+        self._ids = {}              # nama -> id
+        self._active = set()        # nama yang bisa dipilih
+        self._sorted = ()
+        self._lock = threading.Lock()
+
+    def _apply(self, op, p):
+        # Semua operasi idempoten: aman kalau satu perubahan terbaca dua kali
+        if op == "insert":
+            self._labels[p["id"]] = p["name"]
+            self._ids[p["name"]] = p["id"]
+            self._active.add(p["name"])
+        elif op == "delete":
+            self._active.discard(p["name"])
+        elif op == "update":
+            self._labels[p["id"]] = p["new"]
+            if self._ids.get(p["old"]) == p["id"]:
+                del self._ids[p["old"]]
+            self._ids[p["new"]] = p["id"]
+            if p["old"] in self._active:
+                self._active.discard(p["old"])
+                self._active.add(p["new"])
+        self._sorted = tuple(sorted(self._active))
+
+    def _load_full(self):
+        with db_cursor() as cur:
+            cur.execute("SELECT id, name, deleted_at IS NULL FROM categories")
+            rows = cur.fetchall()
+        self._labels = {r[0]: r[1] for r in rows}
+        self._ids = {r[1]: r[0] for r in rows}
+        self._active = {r[1] for r in rows if r[2]}
+        self._sorted = tuple(sorted(self._active))
+
+    def sync(self, version=None):
+        if version is None:
+            version = request_version()
+        with self._lock:
+            if self.version == version:
+                return
+            if self.version is None:
+                self._load_full()
+            else:
+                try:
+                    for c in change_log.iter_since(self.version, entity="category"):
+                        if not c.payload or "id" not in c.payload:
+                            # Entri dari sebelum migrasi category_id
+                            self._load_full()
+                            break
+                        self._apply(c.op, c.payload)
+                except change_log.ChangesExpired:
+                    self._load_full()
+            self.version = version
+
+    # --------------------------
+    # BACA
+    # --------------------------
+    def names(self, version=None):
+        """Tuple nama kategori aktif, urut abjad."""
+        self.sync(version)
+        return self._sorted
+
+    def __contains__(self, name):
+        self.sync()
+        return name in self._active
+
+    def id_of(self, name):
+        """id kategori untuk INSERT (termasuk ✨ Income yang tidak tampil di pilihan)."""
+        self.sync()
+        return self._ids.get(name)
+
+    def ids(self):
+        """Salinan peta nama -> id (semua kategori) untuk lookup massal, mis. import CSV."""
+        self.sync()
+        return dict(self._ids)
+
+    def label(self, category_id):
+        """Nama untuk ditampilkan; '' kalau transaksi tanpa kategori."""
+        if category_id is None:
+            return ""
+        name = self._labels.get(category_id)
+        if name is None:
+            # Kategori baru dari proses lain yang belum terbaca: muat ulang
+            # peta saja, versinya tetap (perubahan berikutnya idempoten)
+            with self._lock:
+                self._load_full()
+            name = self._labels.get(category_id, "")
+        return name
+
+    # --------------------------
+    # TULIS
+    # --------------------------
+    def add(self, name):
+        """Tambah kategori; nama yang pernah dihapus diaktifkan lagi dengan id lamanya."""
+        with db_cursor(commit=True) as cur:
+            version = bump_version(cur)
+            cur.execute("SELECT id, deleted_at IS NULL FROM categories WHERE name = %s FOR UPDATE", (name,))
+            row = cur.fetchone()
+            if row is None:
+                cur.execute("INSERT INTO categories (name) VALUES (%s)", (name,))
+                payload = {"id": cur.lastrowid, "name": name}
+            elif not row[1]:
+                cur.execute("UPDATE categories SET deleted_at = NULL WHERE id = %s", (row[0],))
+                payload = {"id": row[0], "name": name}
+            else:
+                payload = None
+            if payload:
+                change_log.record(cur, version, "category", "insert", payload["id"], payload)
+        self.record(version, "insert", payload)
+
+    def delete(self, name):
+        with db_cursor(commit=True) as cur:
+            version = bump_version(cur)
+            cur.execute("SELECT id FROM categories WHERE name = %s AND deleted_at IS NULL FOR UPDATE", (name,))
+            row = cur.fetchone()
+            payload = None
+            if row:
+                cur.execute("UPDATE categories SET deleted_at = NOW() WHERE id = %s", (row[0],))
+                payload = {"id": row[0], "name": name}
+                change_log.record(cur, version, "category", "delete", row[0], payload)
+        self.record(version, "delete", payload)
+
+    def rename(self, old, new):
+        """None kalau berhasil / tidak ada yang diubah; pesan error kalau nama baru sudah dipakai."""
+        error = None
+        with db_cursor(commit=True) as cur:
+            version = bump_version(cur)
+            cur.execute("SELECT id, name FROM categories WHERE name IN (%s, %s) FOR UPDATE", (old, new))
+            found = {r[1]: r[0] for r in cur.fetchall()}
+            payload = None
+            if new in found and old != new:
+                error = "Nama kategori sudah dipakai"
+            elif old in found and old != new:
+                cur.execute("UPDATE categories SET name = %s WHERE id = %s", (new, found[old]))
+                payload = {"id": found[old], "old": old, "new": new}
+                change_log.record(cur, version, "category", "update", found[old], payload)
+        self.record(version, "update", payload)
+        return error
+
+    def record(self, version, op=None, payload=None):
+        """Write-through setelah commit; payload None = versi naik tanpa perubahan."""
+        with self._lock:
+            write_through(self, version, (lambda cat: cat._apply(op, payload)) if payload else None)
+
+    def stats(self):
+        return {"categories": len(self._active), "labels": len(self._labels), "version": self.version}
+
+
+_catalogue = CategoryCatalogue()
+
+
+def get_catalogue():
+    return _catalogue
+
+
+# ==========================================
+# MIGRASI KE category_id
+# ==========================================
+def archive_orphan_labels_sql(cur):
+    """
+    Label di transactions yang tidak ada di tabel categories (kategori yang
+    dulu di-rename/dihapus, dan ✨ Income) dibuatkan baris yang langsung
+    ditandai terhapus: punya id untuk backfill, tapi tidak muncul di pilihan.
+    """
+    cur.execute("""
+        INSERT IGNORE INTO categories (name, deleted_at)
+        SELECT DISTINCT category, NOW()
+        FROM transactions
+        WHERE category IS NOT NULL AND category <> ''
+    """)
+    cur.execute("INSERT IGNORE INTO categories (name, deleted_at) VALUES (%s, NOW())", (INCOME_CATEGORY,))
+
+
+def backfill_ids(cur, batch=BACKFILL_BATCH):
+    """
+    Isi transactions.category_id per potongan id, masing-masing di transaksi
+    sendiri supaya lock-nya singkat. Bisa dilanjutkan: kalau terputus, migrasi
+    dijalankan ulang mulai dari id terkecil yang masih NULL.
+    """
+    cur.execute("SELECT MIN(id), MAX(id) FROM transactions WHERE category_id IS NULL")
+    lo, hi = cur.fetchone()
+    if lo is None:
+        return
+
+    while lo <= hi:
+        with db_cursor(commit=True) as bcur:
+            bcur.execute("""
+                UPDATE transactions t
+                JOIN categories c ON c.name = t.category
+                SET t.category_id = c.id
+                WHERE t.id BETWEEN %s AND %s AND t.category_id IS NULL
+            """, (lo, lo + batch - 1))
+        lo += batch
@@ -0,0 +1,253 @@
+"""
+Change log append-only ledger_changes (change data capture).
+
+Setiap writer (add/delete transaksi, CRUD kategori, import CSV) menulis satu
+baris per perubahan di transaksi DB yang sama dengan perubahan datanya,
+dengan versi ledger hasil bump_version(). Karena semua writer menaikkan
+versi dulu, urutan (version, id) = urutan commit.
+
+Konsumen (ledger_cache, sheets_sync, ...) cukup menyimpan versi terakhir
+yang sudah diproses lalu membaca read_since(versi). Satu versi tidak pernah
+dipotong di tengah, jadi versi saja cukup sebagai cursor.
+
+Kompaksi:
+
+    python change_log.py compact [--days 30]
+    python change_log.py tail [--since N]
+
+  - insert/update transaksi yang kemudian dihapus dibuang (delete-nya saja
+    yang tersisa). Baris kategori tidak di-collapse: hapus kategori hanya
+    soft delete, label (termasuk hasil rename) tetap dibutuhkan konsumen
+    untuk transaksi lamanya
+  - baris lebih tua dari retensi dihapus, tapi tidak melewati checkpoint
+    konsumen di sync_checkpoints
+Versi tertinggi yang sudah dibuang dicatat di ledger_version.compacted_version;
+pembaca dengan cursor di bawahnya mendapat ChangesExpired dan harus load ulang.
+"""
+import argparse
+import json
+import os
+from collections import namedtuple
+
+from db import db_cursor
+
+CHUNK = 1000
+RETENTION_DAYS = int(os.environ.get("LEDGER_CHANGES_RETENTION_DAYS", 30))
+
+Change = namedtuple("Change", "id version entity op key payload created_at")
+
+
+class ChangesExpired(Exception):
+    """Cursor lebih tua dari hasil kompaksi; konsumen harus load penuh."""
+
+    def __init__(self, since, horizon):
+        super().__init__(f"versi {since} sudah dikompaksi (horizon {horizon})")
+        self.since = since
+        self.horizon = horizon
+
+
+# ==========================================
+# TULIS (DIPANGGIL DI DALAM TRANSAKSI ROUTE)
+# ==========================================
+def record(cur, version, entity, op, key, payload=None):
+    cur.execute("""
+        INSERT INTO ledger_changes (version, entity, op, entity_key, payload)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (version, entity, op, str(key), json.dumps(payload) if payload is not None else None))
+
+
+def record_transaction_inserts(cur, version, first_id):
+    """
+    Catat semua transaksi dengan id >= first_id (hasil INSERT / executemany
+    barusan). Aman karena lock versi ledger masih dipegang transaksi ini.
+    """
+    cur.execute("""
+        INSERT INTO ledger_changes (version, entity, op, entity_key, payload)
+        SELECT %s, 'transaction', 'insert', id, JSON_OBJECT(
+            'id', id,
+            'date', date,
+            'category_id', category_id,
+            'desc', description,
+            'amount', CAST(ROUND(amount) AS SIGNED),
+            'type', type,
+            'usage', usage_type,
+            'by', created_by
+        )
+        FROM transactions
+        WHERE id >= %s
+        ORDER BY id
+    """, (version, first_id))
+
+
+def record_transaction_delete(cur, version, tid, row):
+    """row: dict hasil SELECT date, type, usage_type, category_id, amount."""
+    record(cur, version, "transaction", "delete", tid, {
+        "id": tid,
+        "date": row["date"].isoformat() if row["date"] else None,
+        "category_id": row["category_id"],
+        "amount": int(round(row["amount"])) if row["amount"] is not None else 0,
+        "type": row["type"],
+        "usage": row["usage_type"],
+    })
+
+
+def backfill_sql(cur):
+    """
+    Isi awal (migrasi): tombstone lama jadi 'delete', lalu semua transaksi dan
+    kategori yang ada sekarang dicatat sebagai 'insert' di versi saat ini,
+    supaya log lengkap sejak versi 0.
+    """
+    cur.execute("SELECT version FROM ledger_version WHERE id = 1")
+    version = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO ledger_changes (version, entity, op, entity_key, created_at)
+        SELECT version, 'transaction', 'delete', txn_id, deleted_at
+        FROM transaction_tombstones
+        ORDER BY version, txn_id
+    """)
+    # Skema saat migrasi 0008: transactions.category masih label string
+    cur.execute("""
+        INSERT INTO ledger_changes (version, entity, op, entity_key, payload)
+        SELECT %s, 'transaction', 'insert', id, JSON_OBJECT(
+            'id', id,
+            'date', date,
+            'category', category,
+            'desc', description,
+            'amount', CAST(ROUND(amount) AS SIGNED),
+            'type', type,
+            'usage', usage_type,
+            'by', created_by
+        )
+        FROM transactions
+        ORDER BY id
+    """, (version,))
+    cur.execute("""
+        INSERT INTO ledger_changes (version, entity, op, entity_key, payload)
+        SELECT %s, 'category', 'insert', name, JSON_OBJECT('name', name)
+        FROM categories
+        ORDER BY name
+    """, (version,))
+
+
+# ==========================================
+# BACA
+# ==========================================
+def compacted_version(cur):
+    cur.execute("SELECT compacted_version FROM ledger_version WHERE id = 1")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def _row_to_change(r):
+    payload = r[5]
+    if isinstance(payload, (bytes, bytearray)):
+        payload = payload.decode("utf-8")
+    return Change(r[0], r[1], r[2], r[3], r[4], json.loads(payload) if payload else None, r[6])
+
+
+def read_since(since, limit=CHUNK, entity=None, op=None):
+    """
+    Perubahan dengan version > since, urut (version, id), paling sedikit
+    `limit` baris kecuali sudah habis. Versi terakhir selalu lengkap.
+    Kembalikan (changes, next_since); next_since == since kalau kosong.
+    """
+    where, params = ["version > %s"], [since]
+    if entity:
+        where.append("entity = %s")
+        params.append(entity)
+    if op:
+        where.append("op = %s")
+        params.append(op)
+    cond = " AND ".join(where)
+    cols = "id, version, entity, op, entity_key, payload, created_at"
+
+    with db_cursor() as cur:
+        horizon = compacted_version(cur)
+        if since < horizon:
+            raise ChangesExpired(since, horizon)
+
+        cur.execute(f"""
+            SELECT {cols} FROM ledger_changes
+            WHERE {cond}
+            ORDER BY version, id
+            LIMIT %s
+        """, (*params, limit))
+        rows = cur.fetchall()
+
+        if len(rows) == limit:
+            # Lengkapi versi terakhir yang terpotong LIMIT
+            last = rows[-1]
+            cur.execute(f"""
+                SELECT {cols} FROM ledger_changes
+                WHERE {cond.replace("version > %s", "version = %s")} AND id > %s
+                ORDER BY id
+            """, (last[1], *params[1:], last[0]))
+            rows.extend(cur.fetchall())
+
+    changes = [_row_to_change(r) for r in rows]
+    return changes, (changes[-1].version if changes else since)
+
+
+def iter_since(since, entity=None, op=None, chunk=CHUNK):
+    """Generator semua perubahan setelah `since`, dibaca per potongan."""
+    while True:
+        changes, since = read_since(since, chunk, entity, op)
+        yield from changes
+        if len(changes) < chunk:
+            return
+
+
+# ==========================================
+# KOMPAKSI
+# ==========================================
+def compact(days=RETENTION_DAYS):
+    """Kembalikan (jumlah baris di-collapse, jumlah baris kadaluarsa dibuang)."""
+    with db_cursor(commit=True) as cur:
+        # 1. insert/update transaksi yang sudah disusul delete untuk id yang sama
+        cur.execute("""
+            DELETE c FROM ledger_changes c
+            JOIN ledger_changes d
+              ON d.entity = c.entity AND d.entity_key = c.entity_key
+             AND d.op = 'delete' AND d.version > c.version
+            WHERE c.entity = 'transaction' AND c.op IN ('insert', 'update')
+        """)
+        collapsed = cur.rowcount
+
+        # 2. batas retensi, tidak boleh melewati checkpoint konsumen
+        cur.execute("""
+            SELECT MAX(version) FROM ledger_changes
+            WHERE created_at < NOW() - INTERVAL %s DAY
+        """, (days,))
+        horizon = cur.fetchone()[0]
+        cur.execute("SELECT MIN(last_version) FROM sync_checkpoints")
+        slowest = cur.fetchone()[0]
+        if horizon is not None and slowest is not None:
+            horizon = min(horizon, slowest)
+
+        expired = 0
+        if horizon and horizon > compacted_version(cur):
+            cur.execute("DELETE FROM ledger_changes WHERE version <= %s", (horizon,))
+            expired = cur.rowcount
+            cur.execute("UPDATE ledger_version SET compacted_version = %s WHERE id = 1", (horizon,))
+
+        # Idempotency key batch offline (delta_sync) cukup selama retensi yang sama
+        cur.execute("DELETE FROM idempotency_keys WHERE created_at < NOW() - INTERVAL %s DAY", (days,))
+
+    return collapsed, expired
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Change log ledger")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_compact = sub.add_parser("compact")
+    p_compact.add_argument("--days", type=int, default=RETENTION_DAYS)
+    p_tail = sub.add_parser("tail")
+    p_tail.add_argument("--since", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.cmd == "compact":
+        collapsed, expired = compact(args.days)
+        print(f"{collapsed} baris di-collapse, {expired} baris kadaluarsa dibuang")
+    else:
+        for c in iter_since(args.since):
+            print(c.version, c.entity, c.op, c.key, json.dumps(c.payload, ensure_ascii=False))
@@ -0,0 +1,151 @@
+"""
+Engine statistik kolumnar (opsional, butuh numpy).
+
+Ledger disimpan sebagai array NumPy: ordinal tanggal, nominal int64, dan kode
+type/usage/kategori. filter() dan stats() memberi hasil yang sama dengan
+filter_transactions() dan calculate_stats() di main.py, tapi memakai mask
+vektor dan np.add.at/reduceat ke int64 (eksak, bukan float), bukan loop
+Python per baris.
+
+    ledger = load()
+    ledger.stats(ledger.filter('month', month='2026-02'))
+
+Benchmark: python bench_columnar.py
+"""
+from datetime import date as date_cls
+
+try:
+    import numpy as np
+except ImportError:  # engine ini opsional
+    np = None
+
+from ledger_cache import all_transactions
+from queries import date_bounds
+
+TYPES = ('in', 'out')
+USAGES = (None, 'pribadi', 'bisnis')
+
+
+def available():
+    return np is not None
+
+
+class ColumnarLedger:
+    def __init__(self, ids, days, amounts, type_codes, usage_codes, category_codes, categories):
+        self.ids = ids
+        self.days = days
+        self.amounts = amounts
+        self.type_codes = type_codes
+        self.usage_codes = usage_codes
+        self.category_codes = category_codes
+        self.categories = categories        # kode -> category_id
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        if np is None:
+            raise RuntimeError("numpy belum terpasang: pip install numpy")
+
+        n = len(transactions)
+        ids = np.empty(n, dtype=np.int64)
+        days = np.empty(n, dtype=np.int32)
+        amounts = np.empty(n, dtype=np.int64)
+        type_codes = np.empty(n, dtype=np.int8)
+        usage_codes = np.empty(n, dtype=np.int8)
+        category_codes = np.empty(n, dtype=np.int32)
+
+        type_map = {t: i for i, t in enumerate(TYPES)}
+        usage_map = {u: i for i, u in enumerate(USAGES)}
+        cat_map = {}
+
+        for i, t in enumerate(transactions):
+            ids[i] = t.id
+            days[i] = t.day
+            amounts[i] = t.amount
+            type_codes[i] = type_map.get(t.type, -1)
+            usage_codes[i] = usage_map.get(t.usage, 0)
+            category_codes[i] = cat_map.setdefault(t.category_id, len(cat_map))
+
+        categories = [None] * len(cat_map)
+        for category_id, code in cat_map.items():
+            categories[code] = category_id
+
+        return cls(ids, days, amounts, type_codes, usage_codes, category_codes, categories)
+
+    # --------------------------
+    # FILTER
+    # --------------------------
+    def filter(self, ftype, start_date=None, end_date=None, month=None):
+        """Mask boolean; sama dengan filter_transactions() (urutan asli tetap)."""
+        bounds = date_bounds(ftype, start_date, end_date, month)
+        if bounds is None:
+            return np.zeros(len(self), dtype=bool)
+
+        start, end = bounds
+        lo = start.toordinal() if start else 1
+        hi = end.toordinal() if end else date_cls.max.toordinal()
+        return (self.days >= lo) & (self.days <= hi)
+
+    def ids_for(self, mask):
+        return self.ids[mask]
+
+    # --------------------------
+    # AGREGASI
+    # --------------------------
+    def stats(self, mask=None):
+        """(balance, total_in, total_out, out_pribadi, out_bisnis), sama dengan calculate_stats()."""
+        type_codes, usage_codes, amounts = self._select(mask)
+
+        valid = type_codes >= 0
+        key = type_codes[valid].astype(np.int64) * len(USAGES) + usage_codes[valid]
+        sums = _sum_by(key, amounts[valid], len(TYPES) * len(USAGES))
+
+        total_in = int(sums[:len(USAGES)].sum())
+        out = sums[len(USAGES):]
+        total_out = int(out.sum())
+        out_pribadi = int(out[USAGES.index('pribadi')])
+        out_bisnis = int(out[USAGES.index('bisnis')])
+
+        return total_in - total_out, total_in, total_out, out_pribadi, out_bisnis
+
+    def by_category(self, mask=None, type_='out'):
+        """{category_id: total} per kategori untuk satu tipe (int64 eksak); label dari katalog kategori."""
+        sel = self.type_codes == TYPES.index(type_)
+        if mask is not None:
+            sel &= mask
+        sums = _sum_by(self.category_codes[sel], self.amounts[sel], len(self.categories))
+        return {self.categories[i]: int(v) for i, v in enumerate(sums) if v}
+
+    def daily_totals(self, mask=None, type_='out'):
+        """(days, totals) per hari untuk satu tipe, lewat sort + reduceat (int64 eksak)."""
+        sel = self.type_codes == TYPES.index(type_)
+        if mask is not None:
+            sel &= mask
+        days = self.days[sel]
+        amounts = self.amounts[sel]
+        if not len(days):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+
+        order = np.argsort(days, kind='stable')
+        days, amounts = days[order], amounts[order]
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        return days[starts], np.add.reduceat(amounts, starts)
+
+    def _select(self, mask):
+        if mask is None:
+            return self.type_codes, self.usage_codes, self.amounts
+        return self.type_codes[mask], self.usage_codes[mask], self.amounts[mask]
+
+
+def _sum_by(keys, amounts, size):
+    """Total amounts per kunci 0..size-1 di int64: bincount(weights=...) menjumlah di float64, tidak eksak di atas 2**53."""
+    sums = np.zeros(size, dtype=np.int64)
+    np.add.at(sums, keys, amounts)
+    return sums
+
+
+def load(version=None):
+    """ColumnarLedger dari cache ledger per worker (ledger_cache), SQL kalau cache tidak lengkap."""
+    return ColumnarLedger.from_transactions(all_transactions(version))
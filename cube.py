@@ -0,0 +1,259 @@
+"""
+Cube OLAP kecil per worker untuk breakdown di /stats: total per
+(hari, kategori, type, usage) dari rollup daily_summary, plus roll-up per bulan.
+
+Dua level agregasi, kunci sel (category_id, type, usage):
+  - days[ordinal]         = isi daily_summary per hari
+  - months[(tahun, bulan)] = jumlah hari-hari di bulan itu
+Total sebuah rentang: bulan yang tercakup penuh diambil dari level bulan,
+hari di bulan pinggir dari level hari (bisect di daftar hari terurut), jadi
+filter 'all' atau bulan cukup menjumlahkan beberapa sel, bukan scan transaksi.
+
+Sama seperti prefix_index: dibangun dari daily_summary, di-update langsung
+oleh add/delete di worker ini, dan dibangun ulang kalau versi ledger
+berubah dari worker lain.
+"""
+import bisect
+import heapq
+import threading
+from collections import defaultdict
+from datetime import date as date_cls
+
+from db import db_cursor
+from ledger import current_version, write_through
+from queries import date_bounds
+
+TOP_N = 5
+TREND_MONTHS = 6
+
+
+def _ordinal(d):
+    return d.toordinal() if isinstance(d, date_cls) else date_cls.fromisoformat(str(d)).toordinal()
+
+
+def _month_of(o):
+    d = date_cls.fromordinal(o)
+    return d.year, d.month
+
+
+def _month_span(y, m):
+    """(ordinal hari pertama, ordinal hari terakhir) bulan itu."""
+    first = date_cls(y, m, 1).toordinal()
+    nxt = date_cls(y + 1, 1, 1) if m == 12 else date_cls(y, m + 1, 1)
+    return first, nxt.toordinal() - 1
+
+
+def _next_month(y, m):
+    return (y + 1, 1) if m == 12 else (y, m + 1)
+
+
+def _prev_month(y, m):
+    return (y - 1, 12) if m == 1 else (y, m - 1)
+
+
+def _add_cell(cells, key, amount):
+    total = cells.get(key, 0) + amount
+    if total:
+        cells[key] = total
+    else:
+        cells.pop(key, None)
+
+
+class Cube:
+    def __init__(self, version=None):
+        self.version = version
+        self.days = {}              # ordinal -> {(category_id, type, usage): total}
+        self.months = {}            # (tahun, bulan) -> {(category_id, type, usage): total}
+        self._day_list = []         # ordinal yang punya sel, terurut
+
+    @classmethod
+    def from_rows(cls, rows, version=None):
+        """rows: (date, category_id, type, usage_type, total) urut naik per tanggal."""
+        cube = cls(version)
+        for d, category_id, type_, usage, total in rows:
+            cube.add(d, category_id, type_, usage, total)
+        return cube
+
+    # --------------------------
+    # UPDATE
+    # --------------------------
+    def add(self, d, category_id, type_, usage, amount):
+        o = _ordinal(d)
+        key = (category_id or 0, type_, usage or '')
+        amount = int(round(amount))
+
+        day = self.days.get(o)
+        if day is None:
+            day = self.days[o] = {}
+            bisect.insort(self._day_list, o)
+        _add_cell(day, key, amount)
+        if not day:
+            del self.days[o]
+            self._day_list.remove(o)
+
+        ym = _month_of(o)
+        month = self.months.setdefault(ym, {})
+        _add_cell(month, key, amount)
+        if not month:
+            del self.months[ym]
+
+    def remove(self, d, category_id, type_, usage, amount):
+        self.add(d, category_id, type_, usage, -amount)
+
+    # --------------------------
+    # QUERY
+    # --------------------------
+    def cells(self, start=None, end=None):
+        """{(category_id, type, usage): total} untuk [start, end]; None = tanpa batas."""
+        out = defaultdict(int)
+        if not self._day_list:
+            return out
+        s = max(_ordinal(start), self._day_list[0]) if start else self._day_list[0]
+        e = min(_ordinal(end), self._day_list[-1]) if end else self._day_list[-1]
+        if s > e:
+            return out
+
+        ym, last = _month_of(s), _month_of(e)
+        while ym <= last:
+            first_day, last_day = _month_span(*ym)
+            if s <= first_day and last_day <= e:
+                parts = [self.months.get(ym, {})]
+            else:
+                lo = bisect.bisect_left(self._day_list, max(s, first_day))
+                hi = bisect.bisect_right(self._day_list, min(e, last_day))
+                parts = [self.days[o] for o in self._day_list[lo:hi]]
+            for cells in parts:
+                for key, total in cells.items():
+                    out[key] += total
+            ym = _next_month(*ym)
+        return out
+
+    def month_totals(self, ym):
+        """(masuk, keluar) satu bulan dari level bulan."""
+        tin = tout = 0
+        for (_, type_, _), total in self.months.get(ym, {}).items():
+            if type_ == 'in':
+                tin += total
+            else:
+                tout += total
+        return tin, tout
+
+    def latest_month(self):
+        return _month_of(self._day_list[-1]) if self._day_list else None
+
+
+# ==========================================
+# ROLL-UP
+# ==========================================
+def by_category(cells, type_='out'):
+    """{category_id: total} untuk satu tipe."""
+    totals = defaultdict(int)
+    for (category_id, t, _), total in cells.items():
+        if t == type_:
+            totals[category_id] += total
+    return totals
+
+
+def top_n(totals, n=TOP_N):
+    """n kategori terbesar lewat heap: [(category_id, total)], plus total sisanya."""
+    top = heapq.nlargest(n, totals.items(), key=lambda kv: kv[1])
+    rest = sum(totals.values()) - sum(v for _, v in top)
+    return top, rest
+
+
+def month_trend(cube, end_month, months=TREND_MONTHS):
+    """[((tahun, bulan), masuk, keluar, % perubahan keluar vs bulan sebelumnya)] naik per bulan."""
+    yms = [end_month]
+    for _ in range(months):
+        yms.append(_prev_month(*yms[-1]))
+    yms.reverse()
+
+    trend = []
+    prev_out = None
+    for ym in yms:
+        tin, tout = cube.month_totals(ym)
+        change = round((tout - prev_out) * 100 / prev_out) if prev_out else None
+        if prev_out is not None:        # bulan pertama hanya pembanding
+            trend.append((ym, tin, tout, change))
+        prev_out = tout
+    return trend
+
+
+# ==========================================
+# CUBE PER WORKER
+# ==========================================
+_cube = None
+_lock = threading.Lock()
+
+
+def _load(version):
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT date, category_id, type, usage_type, total
+            FROM daily_summary
+            ORDER BY date
+        """)
+        return Cube.from_rows(cur.fetchall(), version)
+
+
+def get_cube(version=None):
+    """Cube untuk versi ledger sekarang; dibangun ulang kalau tertinggal."""
+    global _cube
+    if version is None:
+        version = current_version()
+    with _lock:
+        if _cube is None or _cube.version != version:
+            _cube = _load(version)
+        return _cube
+
+
+def breakdown(ftype, start_date=None, end_date=None, month=None, version=None, n=TOP_N):
+    """
+    Breakdown untuk satu filter /stats:
+      categories: [(category_id, total)] top-n pengeluaran, urut terbesar
+      other:      total pengeluaran kategori di luar top-n
+      total_out:  total pengeluaran rentang itu
+      trend:      month_trend() sampai bulan akhir filter
+    """
+    bounds = date_bounds(ftype, start_date, end_date, month)
+    cube = get_cube(version)
+    with _lock:
+        if bounds is None:
+            totals = {}
+        else:
+            totals = by_category(cube.cells(*bounds))
+        top, other = top_n(totals, n)
+
+        end = bounds[1] if bounds and bounds[1] else None
+        end_month = _month_of(end.toordinal()) if end else cube.latest_month()
+        trend = month_trend(cube, end_month) if end_month else []
+
+    return {
+        "categories": top,
+        "other": other,
+        "total_out": sum(totals.values()),
+        "trend": trend,
+    }
+
+
+def daily_cells(start, end, version=None):
+    """[(ordinal, {(category_id, type, usage): total})] untuk hari bertransaksi di [start, end]."""
+    cube = get_cube(version)
+    with _lock:
+        lo = bisect.bisect_left(cube._day_list, _ordinal(start))
+        hi = bisect.bisect_right(cube._day_list, _ordinal(end))
+        return [(o, dict(cube.days[o])) for o in cube._day_list[lo:hi]]
+
+
+def record_insert(version, d, type_, usage, category_id, amount):
+    """Panggil setelah commit, dengan versi hasil bump_version()."""
+    _apply(version, d, type_, usage, category_id, amount)
+
+
+def record_delete(version, d, type_, usage, category_id, amount):
+    _apply(version, d, type_, usage, category_id, -amount)
+
+
+def _apply(version, d, type_, usage, category_id, amount):
+    with _lock:
+        write_through(_cube, version, None if d is None else lambda c: c.add(d, category_id, type_, usage, amount))
@@ -1,9 +1,210 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
 
+# ==========================================
+# KONFIGURASI DATABASE + POOL
+# ==========================================
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "cashflow_user"),
+    "password": os.environ.get("DB_PASSWORD", "Cashflow123!"),
+    "database": os.environ.get("DB_NAME", "cashflow_db"),
+    # Driver pure-Python: socket-nya ikut di-monkey-patch worker gevent
+    # (gunicorn.conf.py), jadi query yang menunggu tidak memblokir worker
+    "use_pure": os.environ.get("DB_USE_PURE", "1") == "1",
+}
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))            # maksimal koneksi per worker
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))     # detik menunggu slot kosong
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))    # detik sebelum koneksi diganti baru
+POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+
+
+class PoolTimeout(Exception):
+    """Tidak ada koneksi kosong dalam batas POOL_TIMEOUT."""
+
+
+class PooledConnection:
+    """Bungkus koneksi mysql; close() mengembalikan koneksi ke pool."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at)
+
+    def discard(self):
+        """Tutup koneksi asli, tidak kembali ke pool (mis. hasil unbuffered yang belum habis dibaca)."""
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at, discard=True)
+
+
+class ConnectionPool:
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE,
+                 pre_ping=POOL_PRE_PING, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.connect_args = connect_args or DB_CONFIG
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # --------------------------
+    # CHECKOUT / RELEASE
+    # --------------------------
+    def connect(self):
+        start = time.monotonic()
+        waited = False
+        if not self._slots.acquire(blocking=False):
+            waited = True
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._waits += 1
+                    self._timeouts += 1
+                raise PoolTimeout(f"Pool penuh ({self.size} koneksi), timeout {self.timeout}s")
+
+        try:
+            raw, created_at = self._checkout_raw()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._waits += waited
+            self._wait_total += elapsed
+            self._wait_max = max(self._wait_max, elapsed)
+
+        return PooledConnection(self, raw, created_at)
+
+    def _checkout_raw(self):
+        while True:
+            try:
+                raw, created_at = self._idle.get_nowait()
+            except queue.Empty:
+                return mysql.connector.connect(**self.connect_args), time.monotonic()
+
+            if self.recycle and time.monotonic() - created_at > self.recycle:
+                self._discard(raw)
+                continue
+
+            if self.pre_ping:
+                try:
+                    raw.ping(reconnect=False)
+                except mysql.connector.Error:
+                    self._discard(raw)
+                    continue
+
+            return raw, created_at
+
+    def _release(self, raw, created_at, discard=False):
+        try:
+            if discard:
+                self._discard(raw)
+                return
+            if raw.in_transaction:
+                raw.rollback()
+            self._idle.put((raw, created_at))
+        except mysql.connector.Error:
+            self._discard(raw)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def _discard(self, raw):
+        with self._lock:
+            self._recycled += 1
+        try:
+            raw.close()
+        except mysql.connector.Error:
+            pass
+
+    # --------------------------
+    # STATISTIK POOL
+    # --------------------------
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "checkout_avg_ms": round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                "checkout_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(**DB_CONFIG)
+    return _pool
+
+
 def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="cashflow_user",
-        password="Cashflow123!",
-        database="cashflow_db"
-    )
+    return get_pool().connect()
+
+
+@contextmanager
+def db_cursor(dictionary=False, commit=False):
+    """Pinjam koneksi + cursor dari pool; commit di akhir kalau diminta, rollback kalau error."""
+    conn = get_db_connection()
+    cur = conn.cursor(dictionary=dictionary)
+    try:
+        yield cur
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def pool_stats():
+    return get_pool().stats()
@@ -0,0 +1,246 @@
+"""
+Sinkron delta untuk klien offline-first (service worker di HP).
+
+    GET  /api/changes?since=<versi>   -> perubahan sejak versi itu
+    POST /api/transactions/batch      -> antrian transaksi offline, sekali kirim
+
+Format /api/changes (ringkas, transaksi sebagai array sesuai FIELDS):
+    {
+      "version": 1234,          # kirim lagi sebagai ?since= berikutnya
+      "more": false,            # true: masih ada sisa, langsung minta lagi
+      "reset": false,           # true: snapshot penuh, buang data lokal dulu
+      "fields": [...],
+      "transactions": {"upsert": [[...], ...], "delete": [id, ...]},
+      "categories": [["insert", nama] | ["update", lama, baru] | ["delete", nama]]
+                    (snapshot: daftar nama),
+      "totals": {"balance": .., "today_in": .., "today_out": ..}
+    }
+since=0 atau cursor yang sudah terpotong kompaksi mendapat snapshot penuh.
+
+Batch POST memakai idempotency key per item (UUID dari klien): kirim ulang
+antrian yang sama tidak menggandakan transaksi, hasilnya id yang sama.
+"""
+from datetime import date as date_cls
+
+import categories
+import change_log
+import importer
+import prefix_index
+from db import db_cursor
+from ledger import bump_version, current_version
+from ledger_cache import all_transactions
+from queries import local_today
+
+FIELDS = ["id", "date", "category", "desc", "amount", "type", "usage", "by"]
+MAX_CHANGES = 5000
+MAX_BATCH = 200
+
+INCOME_CATEGORY = importer.INCOME_CATEGORY
+
+
+def _totals(version):
+    balance, d_in, d_out = prefix_index.dashboard_totals(local_today(), version)
+    return {"balance": int(balance), "today_in": int(d_in), "today_out": int(d_out)}
+
+
+# ==========================================
+# GET /api/changes
+# ==========================================
+def snapshot():
+    version = current_version()
+    txns = all_transactions(version)
+
+    return {
+        "version": version,
+        "more": False,
+        "reset": True,
+        "fields": FIELDS,
+        "transactions": {
+            "upsert": [[t.id, t.date, t.category, t.desc, t.amount, t.type, t.usage, t.by] for t in txns],
+            "delete": [],
+        },
+        "categories": list(categories.get_catalogue().names(version)),
+        "totals": _totals(version),
+    }
+
+
+def _label(payload):
+    # Payload dari sebelum migrasi category_id masih membawa label string
+    if "category_id" in payload:
+        return categories.get_catalogue().label(payload["category_id"])
+    return payload.get("category") or ""
+
+
+def changes_since(since, limit=change_log.CHUNK):
+    if since <= 0:
+        return snapshot()
+    limit = max(1, min(limit, MAX_CHANGES))
+    try:
+        changes, version = change_log.read_since(since, limit)
+    except change_log.ChangesExpired:
+        return snapshot()
+
+    # Gabungkan per id: insert lalu delete di jendela yang sama cukup delete
+    upsert, deleted, category_ops = {}, [], []
+    for c in changes:
+        if c.entity == "transaction":
+            tid = int(c.key)
+            if c.op == "delete":
+                upsert.pop(tid, None)
+                deleted.append(tid)
+            else:
+                p = c.payload
+                upsert[tid] = [tid, p["date"] or "", _label(p), p["desc"],
+                               int(p["amount"]), p["type"], p["usage"], p["by"]]
+        elif c.entity == "category":
+            if c.op == "update":
+                category_ops.append(["update", c.payload["old"], c.payload["new"]])
+            else:
+                # entity_key kategori = id; nama ada di payload
+                category_ops.append([c.op, c.payload["name"]])
+
+    return {
+        "version": version,
+        "more": len(changes) >= limit,
+        "reset": False,
+        "fields": FIELDS,
+        "transactions": {"upsert": list(upsert.values()), "delete": deleted},
+        "categories": category_ops,
+        "totals": _totals(None),
+    }
+
+
+# ==========================================
+# POST /api/transactions/batch
+# ==========================================
+class BatchItemError(ValueError):
+    pass
+
+
+def parse_amount(value):
+    """
+    Nominal JSON -> int rupiah. Angka dipakai apa adanya (harus bulat);
+    pemisah ribuan ('15.000', 'Rp 1.500.000') hanya diurai untuk string.
+    """
+    if isinstance(value, bool):
+        raise BatchItemError("format nominal tidak valid")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise BatchItemError("nominal harus bilangan bulat rupiah")
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return importer._parse_amount(value)
+        except importer.ImportRowError:
+            raise BatchItemError("format nominal tidak valid")
+    raise BatchItemError("format nominal tidak valid")
+
+
+def parse_item(item):
+    """Dict JSON dari klien -> (key, tuple kolom INSERT tanpa created_by/hash)."""
+    if not isinstance(item, dict):
+        raise BatchItemError("item harus object")
+
+    key = str(item.get("key") or "").strip()
+    if not key or len(key) > 64:
+        raise BatchItemError("key wajib diisi (maks 64 karakter)")
+
+    type_ = item.get("type")
+    if type_ not in ("in", "out"):
+        raise BatchItemError("tipe transaksi tidak valid")
+
+    amount = parse_amount(item.get("amount"))
+    if amount <= 0:
+        raise BatchItemError("nominal tidak boleh kosong")
+
+    # Tanggal dari HP (saat dicatat offline); kosong = hari ini
+    raw_date = item.get("date")
+    try:
+        d = date_cls.fromisoformat(raw_date) if raw_date else local_today()
+    except (TypeError, ValueError):
+        raise BatchItemError("tanggal tidak valid")
+
+    if type_ == "in":
+        category, usage = INCOME_CATEGORY, "bisnis"
+    else:
+        category, usage = item.get("category"), item.get("usage") or "pribadi"
+        if category not in categories.get_catalogue():
+            raise BatchItemError("kategori tidak dikenal")
+        if usage not in ("pribadi", "bisnis"):
+            raise BatchItemError("keperluan tidak valid")
+
+    return key, (d.isoformat(), category, (item.get("desc") or "").strip(), amount, type_, usage)
+
+
+def _known_keys(cur, keys):
+    """{idem_key: txn_id} untuk key yang sudah pernah masuk."""
+    marks = ", ".join(["%s"] * len(keys))
+    cur.execute(f"SELECT idem_key, txn_id FROM idempotency_keys WHERE idem_key IN ({marks})", tuple(keys))
+    return dict(cur.fetchall())
+
+
+def insert_batch(items, created_by):
+    """
+    Insert semua item valid di satu transaksi DB. Kembalikan (versi, results)
+    dengan results sejajar items: {"key", "status": created|duplicate|error, "id"|"error"}.
+    """
+    results, parsed = [], []
+    for item in items[:MAX_BATCH]:
+        try:
+            key, row = parse_item(item)
+            results.append({"key": key})
+            parsed.append((len(results) - 1, key, row))
+        except BatchItemError as e:
+            results.append({"key": item.get("key") if isinstance(item, dict) else None,
+                            "status": "error", "error": str(e)})
+    for item in items[MAX_BATCH:]:
+        results.append({"key": item.get("key") if isinstance(item, dict) else None,
+                        "status": "error", "error": f"maks {MAX_BATCH} item per batch"})
+
+    if not parsed:
+        return None, results
+
+    keys = list({key for _, key, _ in parsed})
+    with db_cursor() as cur:
+        known = _known_keys(cur, keys)
+    if len(known) == len(keys):
+        # Kirim ulang antrian yang sudah masuk semua: tanpa tulis, versi ledger
+        # (ETag, index, cube) tetap
+        for pos, key, _ in parsed:
+            results[pos].update(status="duplicate", id=known[key])
+        return current_version(), results
+
+    catalogue = categories.get_catalogue()
+    with db_cursor(commit=True) as cur:
+        # Versi dulu: lock ini juga menserialkan batch dengan key yang sama,
+        # jadi key dicek ulang di bawah lock
+        version = bump_version(cur)
+        known = _known_keys(cur, keys)
+
+        rows, first_pos = [], {}        # first_pos: key baru -> posisi item pertamanya
+        for pos, key, row in parsed:
+            if key in known or key in first_pos:
+                continue
+            first_pos[key] = pos
+            date_str, category, desc, amount, type_, usage = row
+            category_id = catalogue.id_of(category)
+            rows.append((date_str, category_id, desc, amount, type_, usage, created_by,
+                         importer.content_hash(date_str, amount, type_, usage, category_id, desc)))
+
+        if rows:
+            _, first_id = importer.insert_transactions(cur, rows, version)
+            # Id batch ini urut sesuai rows (lihat importer.insert_transactions)
+            cur.execute("SELECT id FROM transactions WHERE id >= %s ORDER BY id", (first_id,))
+            ids = [r[0] for r in cur.fetchall()]
+            known.update(zip(first_pos, ids))
+
+            cur.executemany("INSERT INTO idempotency_keys (idem_key, txn_id) VALUES (%s, %s)",
+                            [(key, known[key]) for key in first_pos])
+
+    for pos, key, _ in parsed:
+        created = first_pos.get(key) == pos
+        results[pos].update(status="created" if created else "duplicate", id=known[key])
+
+    return version, results
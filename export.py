@@ -0,0 +1,206 @@
+"""
+Export transaksi (CSV / XLSX) secara streaming.
+
+Baris diambil dari cache ledger per worker (ledger_cache) dan ditulis ke
+response per potongan kecil. Rentang yang sudah di-evict dari cache dibaca
+lewat cursor MySQL unbuffered (server-side), jadi memori tetap konstan untuk
+export jutaan baris dan byte pertama langsung terkirim.
+
+XLSX ditulis manual: sheet XML dengan inline string, dibungkus ZipFile yang
+menulis ke buffer non-seekable (data descriptor), lalu isi buffer dikirim
+setiap selesai satu potongan.
+"""
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import categories
+from db import get_db_connection
+from ledger_cache import cached_filter
+from queries import date_filter_clause
+
+CHUNK = 1000
+
+HEADER = ["id", "date", "category", "description", "amount", "type", "usage", "created_by"]
+
+
+def iter_rows(ftype, start_date=None, end_date=None, month=None, chunk=CHUNK):
+    """Baris mentah (tuple) urut date DESC, id DESC, per potongan."""
+    cached = cached_filter(ftype, start_date, end_date, month)
+    if cached is None:
+        yield from _iter_rows_sql(ftype, start_date, end_date, month, chunk)
+        return
+
+    # Dari cache ledger per worker: tidak memegang koneksi pool selama download
+    for i in range(0, len(cached), chunk):
+        yield [(t.id, t.date_obj, t.category_id, t.desc, t.amount, t.type, t.usage, t.by)
+               for t in cached[i:i + chunk]]
+
+
+def _iter_rows_sql(ftype, start_date=None, end_date=None, month=None, chunk=CHUNK):
+    """Rentang di luar cache (sudah di-evict): cursor MySQL unbuffered."""
+    where, params = date_filter_clause(ftype, start_date, end_date, month)
+
+    conn = get_db_connection()
+    cur = conn.cursor(buffered=False)
+    done = False
+    try:
+        cur.execute(f"""
+            SELECT id, date, category_id, description, amount, type, usage_type, created_by
+            FROM transactions
+            WHERE {where}
+            ORDER BY date DESC, id DESC
+        """, params)
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+        done = True
+    finally:
+        if done:
+            cur.close()
+            conn.close()
+        else:
+            # Klien memutus di tengah (atau error): sisa hasil tidak dibaca
+            # sampai habis, koneksinya ditutup dan tidak kembali ke pool
+            conn.discard()
+
+
+def _synced_catalogue():
+    # Label kategori dari peta per proses, disamakan dulu dengan versi sekarang
+    catalogue = categories.get_catalogue()
+    catalogue.sync()
+    return catalogue
+
+
+def _cell_values(r, catalogue):
+    tid, d, category_id, desc, amount, type_, usage, by = r
+    category = catalogue.label(category_id)
+    return [tid, d.isoformat() if d else "", category or "", desc or "",
+            int(round(amount)) if amount is not None else 0, type_ or "", usage or "", by or ""]
+
+
+# ==========================================
+# CSV
+# ==========================================
+def stream_csv(*filter_args):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    # BOM supaya Excel membaca UTF-8 (emoji kategori) dengan benar
+    buf.write("\ufeff")
+    writer.writerow(HEADER)
+
+    catalogue = _synced_catalogue()
+    for rows in iter_rows(*filter_args):
+        for r in rows:
+            writer.writerow(_cell_values(r, catalogue))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+# ==========================================
+# XLSX
+# ==========================================
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Transaksi" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_SHEET_HEAD = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>"""
+
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+# Karakter kontrol tidak valid di XML 1.0
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _Drain(io.RawIOBase):
+    """File tujuan ZipFile yang tidak bisa di-seek; isinya diambil per potongan."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _xlsx_row(values):
+    cells = []
+    for v in values:
+        if isinstance(v, int):
+            cells.append(f"<c><v>{v}</v></c>")
+        else:
+            text = escape(_INVALID_XML.sub("", str(v)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return "<row>" + "".join(cells) + "</row>"
+
+
+def stream_xlsx(*filter_args):
+    drain = _Drain()
+    zf = zipfile.ZipFile(drain, "w", compression=zipfile.ZIP_DEFLATED)
+
+    zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+    zf.writestr("_rels/.rels", _ROOT_RELS)
+    zf.writestr("xl/workbook.xml", _WORKBOOK)
+    zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+    yield drain.take()
+
+    with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+        sheet.write((_SHEET_HEAD + _xlsx_row(HEADER)).encode("utf-8"))
+        catalogue = _synced_catalogue()
+        for rows in iter_rows(*filter_args):
+            sheet.write("".join(_xlsx_row(_cell_values(r, catalogue)) for r in rows).encode("utf-8"))
+            data = drain.take()
+            if data:
+                yield data
+        sheet.write(_SHEET_TAIL.encode("utf-8"))
+
+    zf.close()
+    yield drain.take()
+
+
+FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "xlsx": (stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
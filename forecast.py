@@ -0,0 +1,194 @@
+"""
+Proyeksi saldo 30/90 hari ke depan untuk dashboard (numpy).
+
+Deret harian dibangun sekali per versi ledger dari level hari cube.py (tanpa
+query tambahan): satu baris per (kategori, type), HISTORY_DAYS hari terakhir
+sampai kemarin. Per deret, semuanya operasi array:
+
+  1. pola bulanan berulang: tanggal-dalam-bulan yang hampir selalu terisi
+     (tagihan, gaji) di kategori yang tidak harian -> nominal rata-ratanya
+  2. musiman mingguan (deret harian saja): rasio nilai harian terhadap
+     rata-rata bergerak 7 hari (cumsum), dirata-rata per hari dalam minggu
+  3. level: exponential smoothing dari sisa deret yang sudah dibersihkan
+     dari pola 1 dan 2 (bobot EWMA sebagai satu perkalian matriks)
+
+Ramalan harian = level x faktor hari-dalam-minggu + nominal berulang pada
+tanggalnya. Saldo proyeksi = saldo sekarang + kumulatif (masuk - keluar).
+
+Hasil di-cache per (versi ledger, hari ini), jadi home() hanya membayar
+hitungannya sekali setelah setiap perubahan ledger.
+"""
+import threading
+from datetime import date as date_cls
+
+import numpy as np
+
+import cube
+from queries import local_today
+
+HISTORY_DAYS = 365
+HORIZONS = (30, 90)
+EWMA_SPAN = 30
+RECURRING_MIN_MONTHS = 3        # minimal kemunculan tanggal yang sama
+RECURRING_SHARE = 0.75          # ... di sekian bagian dari bulan yang teramati
+DAILY_SHARE = 0.5               # deret yang terisi >= 50% hari dianggap harian
+
+
+# ==========================================
+# DERET HARIAN
+# ==========================================
+def build_series(day_cells, first, days):
+    """
+    (keys, X): keys [(category_id, type)], X array (deret, hari) nominal
+    harian mulai ordinal `first`. usage digabung.
+    """
+    index = {}
+    cols, rows, vals = [], [], []
+    for o, cells in day_cells:
+        for (category_id, type_, _), total in cells.items():
+            rows.append(index.setdefault((category_id, type_), len(index)))
+            cols.append(o - first)
+            vals.append(total)
+
+    X = np.zeros((len(index), days))
+    np.add.at(X, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), vals)
+    return list(index), X
+
+
+def _calendar(first, days):
+    """(hari dalam minggu 0-6, tanggal 1-31 dikurangi 1, indeks bulan) per hari."""
+    ordinals = np.arange(first, first + days)
+    dow = ordinals % 7
+    d0 = date_cls.fromordinal(first)
+    dates = [date_cls.fromordinal(int(o)) for o in ordinals]
+    dom = np.fromiter((d.day - 1 for d in dates), dtype=np.intp, count=days)
+    month = np.fromiter(((d.year - d0.year) * 12 + d.month - d0.month for d in dates),
+                        dtype=np.intp, count=days)
+    return dow, dom, month
+
+
+def moving_average(X, window):
+    """Rata-rata bergerak `window` hari (jendela berakhir di hari itu) per baris, lewat cumsum."""
+    cs = np.cumsum(np.pad(X, ((0, 0), (1, 0))), axis=1)
+    return (cs[:, window:] - cs[:, :-window]) / window
+
+
+def ewma_level(X, span=EWMA_SPAN):
+    """Nilai EWMA terakhir per baris: satu perkalian dengan vektor bobot ternormalisasi."""
+    alpha = 2 / (span + 1)
+    weights = (1 - alpha) ** np.arange(X.shape[1] - 1, -1, -1)
+    return X @ (weights / weights.sum())
+
+
+# ==========================================
+# KOMPONEN
+# ==========================================
+def is_daily(X):
+    """Deret yang terisi di sebagian besar hari (makan, transport) -> pola mingguan; sisanya pola bulanan."""
+    return (X > 0).mean(axis=1) >= DAILY_SHARE
+
+
+def recurring(X, dom, month):
+    """
+    (mask, amount) berbentuk (deret, 31): tanggal yang berulang hampir tiap
+    bulan dan nominal rata-ratanya. Deret harian dilewati (pola mingguan saja).
+    """
+    n, _ = X.shape
+    months = int(month[-1]) + 1
+    hits = np.zeros((n, months, 31), dtype=bool)
+    amounts = np.zeros((n, months, 31))
+    hits[:, month, dom] = X > 0
+    amounts[:, month, dom] = X
+
+    count = hits.sum(axis=1)
+    need = max(RECURRING_MIN_MONTHS, RECURRING_SHARE * months)
+    mask = (count >= need) & ~is_daily(X)[:, None]
+    amount = np.where(mask, amounts.sum(axis=1) / np.maximum(count, 1), 0)
+    return mask, amount
+
+
+def weekly_factors(X, dow):
+    """Faktor hari-dalam-minggu (deret, 7) dengan rata-rata 1: rasio terhadap MA 7 hari terpusat."""
+    n, days = X.shape
+    factors = np.ones((n, 7))
+    if days < 14:
+        return factors
+
+    ma = moving_average(X, 7)                   # ma[:, i] = rata-rata hari i..i+6
+    center = X[:, 3:days - 3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(ma > 0, center / ma, np.nan)
+    center_dow = dow[3:days - 3]
+    for d in range(7):
+        cols = ratio[:, center_dow == d]
+        seen = ~np.isnan(cols).all(axis=1)
+        factors[seen, d] = np.nanmean(cols[seen], axis=1)
+
+    factors = np.clip(factors, 0, 7)
+    mean = factors.mean(axis=1, keepdims=True)
+    return np.where(mean > 0, factors / np.where(mean > 0, mean, 1), 1)
+
+
+def project(X, first, horizon):
+    """Ramalan harian (deret, horizon) mulai hari setelah deret X berakhir."""
+    days = X.shape[1]
+    dow, dom, month = _calendar(first, days)
+
+    mask, amount = recurring(X, dom, month)
+    residual = np.where(mask[:, dom], 0, X)
+    # Rasio mingguan dari kejadian jarang hanya noise: deret non-harian memakai faktor 1
+    factors = np.where(is_daily(X)[:, None], weekly_factors(residual, dow), 1)
+    f = factors[:, dow]
+    level = ewma_level(np.divide(residual, f, out=np.zeros_like(residual), where=f > 0))
+
+    f_dow, f_dom, _ = _calendar(first + days, horizon)
+    return level[:, None] * factors[:, f_dow] + amount[:, f_dom]
+
+
+# ==========================================
+# PROYEKSI SALDO (CACHE PER VERSI LEDGER)
+# ==========================================
+_cached = (None, None)
+_lock = threading.Lock()
+
+
+def forecast(version=None, today=None):
+    """
+    {"in": [..], "out": [..]} ramalan harian max(HORIZONS) hari mulai besok,
+    atau None kalau belum ada riwayat.
+    """
+    global _cached
+    today = today or local_today()
+    key = (version, today)
+    with _lock:
+        if version is not None and _cached[0] == key:
+            return _cached[1]
+
+    last = today.toordinal() - 1
+    first = last - HISTORY_DAYS + 1
+    day_cells = cube.daily_cells(date_cls.fromordinal(first), date_cls.fromordinal(last), version)
+
+    result = None
+    if day_cells:
+        # Riwayat yang lebih pendek dari HISTORY_DAYS: mulai dari hari transaksi pertama
+        first = day_cells[0][0]
+        keys, X = build_series(day_cells, first, last - first + 1)
+        F = project(X, first, max(HORIZONS))
+        is_in = np.array([t == 'in' for _, t in keys])
+        result = {"in": F[is_in].sum(axis=0), "out": F[~is_in].sum(axis=0)}
+
+    with _lock:
+        _cached = (key, result)
+    return result
+
+
+def projection(balance, version=None, today=None):
+    """[(hari, saldo proyeksi, total masuk, total keluar)] untuk tiap HORIZONS, atau None."""
+    daily = forecast(version, today)
+    if daily is None:
+        return None
+    path = balance + np.cumsum(daily["in"] - daily["out"])
+    return [
+        (h, float(path[h - 1]), float(daily["in"][:h].sum()), float(daily["out"][:h].sum()))
+        for h in HORIZONS
+    ]
@@ -0,0 +1,21 @@
+"""
+Konfigurasi gunicorn production, otomatis dibaca dari direktori kerja:
+
+    gunicorn main:app
+
+Worker gevent: setiap request (termasuk koneksi SSE /api/stream yang hampir
+selalu idle) jalan sebagai greenlet, bukan thread OS, jadi ratusan klien
+live cukup dilayani beberapa worker. gevent me-monkey-patch socket, Queue
+dan threading sebelum app di-import; mysql-connector dipaksa mode
+pure-Python (db.DB_CONFIG use_pure) supaya query juga kooperatif.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gevent"
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 1000))
+
+# Stream SSE mengirim ": ping" tiap live.HEARTBEAT detik, jadi koneksi idle tetap hidup
+timeout = 30
+keepalive = 75
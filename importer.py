@@ -0,0 +1,312 @@
+"""
+Import CSV mutasi bank / riwayat lama ke tabel transactions.
+
+    python importer.py mutasi.csv --by Sisil [--default-category "🛍️ Belanja"]
+
+Alur: CSV dibaca streaming baris per baris -> divalidasi dan kategori
+dicocokkan ke tabel categories -> dedupe pakai content_hash -> INSERT dengan
+executemany per batch, satu transaksi DB per batch (rollup, index bulan dan
+versi ledger ikut di transaksi yang sama).
+
+Kolom yang dikenali (huruf besar/kecil bebas):
+  tanggal : date / tanggal / tgl
+  nominal : amount / nominal (negatif = keluar), atau debit + credit / debet + kredit
+  lainnya : description / desc / keterangan, category / kategori, type, usage
+File hasil /export juga bisa di-import ulang.
+
+Dedupe: hash dari (tanggal, nominal, type, usage, category_id, keterangan).
+Baris file hanya masuk kalau hash yang sama muncul lebih sering di file
+daripada di DB, jadi import ulang file yang sama tidak menggandakan data,
+tapi dua transaksi identik yang memang ada tetap tersimpan. Hash memakai
+category_id, bukan label, supaya tetap cocok setelah kategori di-rename.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from db import db_cursor
+from ledger import bump_version
+import categories
+import change_log
+import rollup
+
+BATCH_SIZE = 1000
+
+INCOME_CATEGORY = categories.INCOME_CATEGORY
+
+# Sama persis dengan content_hash() di bawah; dipakai untuk backfill baris lama
+CONTENT_HASH_SQL = """
+    SHA1(CONCAT_WS('|',
+        DATE_FORMAT(date, '%Y-%m-%d'),
+        CAST(ROUND(amount) AS SIGNED),
+        type,
+        COALESCE(usage_type, ''),
+        COALESCE(category_id, ''),
+        TRIM(COALESCE(description, ''))
+    ))
+"""
+
+_ALIASES = {
+    "date": ("date", "tanggal", "tgl"),
+    "amount": ("amount", "nominal", "jumlah"),
+    "debit": ("debit", "debet"),
+    "credit": ("credit", "kredit"),
+    "desc": ("description", "desc", "keterangan"),
+    "category": ("category", "kategori"),
+    "type": ("type", "tipe"),
+    "usage": ("usage", "usage_type", "keperluan"),
+}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y")
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def content_hash(date_str, amount, type_, usage, category_id, desc):
+    category = str(category_id) if category_id is not None else ""
+    # strip(" ") seperti TRIM() MySQL (hanya spasi): tab/newline di tepi ikut di-hash di kedua sisi
+    raw = "|".join((date_str, str(amount), type_, usage or "", category, (desc or "").strip(" ")))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# ==========================================
+# PARSING
+# ==========================================
+def _column_map(fieldnames):
+    lower = {(f or "").strip().lower().lstrip("\ufeff"): f for f in fieldnames}
+    return {key: next((lower[a] for a in aliases if a in lower), None)
+            for key, aliases in _ALIASES.items()}
+
+
+def _parse_date(value):
+    value = (value or "").strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ImportRowError(f"tanggal tidak valid: {value!r}")
+
+
+def _parse_amount(value):
+    """'1.500.000' / '-25,000.00' / '1500000' -> int rupiah."""
+    value = (value or "").strip().replace("Rp", "").replace(" ", "")
+    if not value:
+        return 0
+    negative = value.startswith("-") or (value.startswith("(") and value.endswith(")"))
+    value = value.strip("-()")
+    # Pisahkan desimal (2 digit terakhir setelah , atau .) dari pemisah ribuan
+    if len(value) > 3 and value[-3] in ",.":
+        value = value[:-3]
+    digits = value.replace(".", "").replace(",", "")
+    if not digits.isdigit():
+        raise ImportRowError(f"nominal tidak valid: {value!r}")
+    return -int(digits) if negative else int(digits)
+
+
+class CategoryMatcher:
+    """Cocokkan 'makan' / 'Makan' / '🍔 Makan' ke nama kategori di tabel categories."""
+
+    def __init__(self, names, default=None, ids=None):
+        self.names = set(names)
+        self.ids = ids or {}        # nama -> category_id
+        if default and default not in self.names:
+            raise ImportRowError(f"kategori default tidak dikenal: {default!r}")
+        self.default = default
+        self._by_key = {}
+        for name in names:
+            self._by_key.setdefault(self._key(name), name)
+            self._by_key.setdefault(self._key(name.split(" ", 1)[-1]), name)
+
+    @staticmethod
+    def _key(label):
+        return "".join(ch for ch in label.lower() if ch.isalnum())
+
+    def match(self, label):
+        label = (label or "").strip()
+        if label in self.names:
+            return label
+        found = self._by_key.get(self._key(label)) if label else None
+        if found:
+            return found
+        if self.default:
+            return self.default
+        raise ImportRowError(f"kategori tidak dikenal: {label!r}")
+
+
+def parse_rows(lines, matcher, created_by):
+    """
+    Generator (line_no, row_tuple | ImportRowError) dari file CSV teks.
+    row_tuple urut kolom INSERT: date, category_id, description, amount, type,
+    usage_type, created_by, content_hash.
+    """
+    reader = csv.DictReader(lines)
+    cols = _column_map(reader.fieldnames or [])
+    if not cols["date"] or not (cols["amount"] or cols["debit"] or cols["credit"]):
+        raise ImportRowError("header CSV harus punya kolom tanggal dan nominal/debit/kredit")
+
+    def get(row, key):
+        return row.get(cols[key]) if cols[key] else None
+
+    for line_no, row in enumerate(reader, start=2):
+        try:
+            d = _parse_date(get(row, "date"))
+
+            if cols["amount"]:
+                amount = _parse_amount(get(row, "amount"))
+            else:
+                amount = _parse_amount(get(row, "credit")) - _parse_amount(get(row, "debit"))
+
+            type_ = (get(row, "type") or "").strip().lower()
+            if type_ not in ("in", "out"):
+                type_ = "in" if amount > 0 else "out"
+            amount = abs(amount)
+            if amount == 0:
+                raise ImportRowError("nominal kosong")
+
+            # Normalisasi sama dengan content_hash()/CONTENT_HASH_SQL, supaya hasil
+            # /export yang di-import ulang cocok dengan hash baris aslinya
+            desc = (get(row, "desc") or "").strip(" ")
+            if type_ == "in":
+                # Sama dengan add_transaction: pemasukan selalu Income/bisnis
+                category, usage = INCOME_CATEGORY, "bisnis"
+            else:
+                category = matcher.match(get(row, "category"))
+                usage = (get(row, "usage") or "pribadi").strip().lower()
+                if usage not in ("pribadi", "bisnis"):
+                    raise ImportRowError(f"keperluan tidak valid: {usage!r}")
+
+            date_str = d.isoformat()
+            category_id = matcher.ids.get(category)
+            h = content_hash(date_str, amount, type_, usage, category_id, desc)
+            yield line_no, (date_str, category_id, desc, amount, type_, usage, created_by, h)
+        except ImportRowError as e:
+            yield line_no, e
+
+
+# ==========================================
+# INSERT BATCH
+# ==========================================
+def _existing_counts(cur, hashes):
+    if not hashes:
+        return {}
+    marks = ", ".join(["%s"] * len(hashes))
+    cur.execute(f"""
+        SELECT content_hash, COUNT(*) FROM transactions
+        WHERE content_hash IN ({marks})
+        GROUP BY content_hash
+    """, tuple(hashes))
+    return dict(cur.fetchall())
+
+
+def insert_transactions(cur, rows, version=None):
+    """
+    executemany INSERT rows (urut kolom parse_rows) + change log + rollup,
+    di transaksi DB `cur`. Dipakai juga oleh delta_sync.insert_batch.
+    Versi dinaikkan dulu kecuali pemanggil sudah memegangnya (`version`).
+    Kembalikan (versi, first_id): id baris ini first_id, first_id + 1, ...
+    """
+    if version is None:
+        # Versi dulu (urutan id = urutan commit, lihat ledger_cache)
+        version = bump_version(cur)
+    # Lock versi dipegang: semua id >= first_id pasti milik batch ini
+    cur.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM transactions")
+    first_id = cur.fetchone()[0]
+    cur.executemany("""
+        INSERT INTO transactions
+        (date, category_id, description, amount, type, usage_type, created_by, content_hash)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+    change_log.record_transaction_inserts(cur, version, first_id)
+    rollup.record_inserts(cur, [(r[0], r[4], r[5], r[1], r[3]) for r in rows])
+    return version, first_id
+
+
+def _insert_batch(batch, seen, db_counts):
+    """Satu transaksi DB: dedupe, executemany INSERT, change log, rollup. Kembalikan jumlah baris masuk."""
+    with db_cursor(commit=True) as cur:
+        new_hashes = {r[-1] for r in batch} - db_counts.keys()
+        fetched = _existing_counts(cur, list(new_hashes))
+        for h in new_hashes:
+            db_counts[h] = fetched.get(h, 0)
+
+        rows = []
+        for r in batch:
+            h = r[-1]
+            seen[h] += 1
+            if seen[h] > db_counts[h]:
+                rows.append(r)
+        if not rows:
+            return 0
+
+        insert_transactions(cur, rows)
+
+    return len(rows)
+
+
+def import_csv(lines, created_by, default_category=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Import dari iterable baris teks CSV. progress(stats) dipanggil setiap
+    batch selesai. Kembalikan stats: read, inserted, duplicates, errors (list).
+    """
+    catalogue = categories.get_catalogue()
+    matcher = CategoryMatcher(catalogue.names(), default_category, catalogue.ids())
+
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "errors": []}
+    seen = defaultdict(int)
+    db_counts = {}
+    batch = []
+
+    def flush():
+        inserted = _insert_batch(batch, seen, db_counts)
+        stats["inserted"] += inserted
+        stats["duplicates"] += len(batch) - inserted
+        batch.clear()
+        if progress:
+            progress(stats)
+
+    for line_no, item in parse_rows(lines, matcher, created_by):
+        stats["read"] += 1
+        if isinstance(item, ImportRowError):
+            stats["errors"].append((line_no, str(item)))
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return stats
+
+
+def open_text(binary_file):
+    """Bungkus file upload (bytes) jadi stream teks tanpa memuat semuanya."""
+    return io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import CSV transaksi")
+    parser.add_argument("file")
+    parser.add_argument("--by", required=True, help="nama pencatat (created_by)")
+    parser.add_argument("--default-category", help="kategori untuk label yang tidak dikenal")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    def report(s):
+        print(f"\rdibaca {s['read']:,}  masuk {s['inserted']:,}  duplikat {s['duplicates']:,}  "
+              f"error {len(s['errors']):,}", end="", file=sys.stderr, flush=True)
+
+    with open(args.file, encoding="utf-8-sig", newline="") as f:
+        result = import_csv(f, args.by, args.default_category, args.batch_size, report)
+
+    print(file=sys.stderr)
+    for line_no, msg in result["errors"][:50]:
+        print(f"baris {line_no}: {msg}", file=sys.stderr)
+    if len(result["errors"]) > 50:
+        print(f"... dan {len(result['errors']) - 50} error lain", file=sys.stderr)
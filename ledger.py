@@ -0,0 +1,156 @@
+"""
+Versi ledger: satu angka yang naik setiap ada perubahan transaksi/kategori.
+
+Dipakai untuk ETag halaman baca (/, /stats, /data) dan untuk mengecek
+apakah cache per worker (prefix_index, dll.) masih valid, cukup dengan
+satu lookup primary key.
+"""
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, g, has_app_context, make_response, request, session
+
+from db import db_cursor
+
+
+def bump_version(cur):
+    """Naikkan versi di transaksi DB yang sedang berjalan; kembalikan versi baru."""
+    cur.execute("UPDATE ledger_version SET version = LAST_INSERT_ID(version + 1) WHERE id = 1")
+    return cur.lastrowid
+
+
+def current_version():
+    with db_cursor() as cur:
+        cur.execute("SELECT version FROM ledger_version WHERE id = 1")
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def current_versions(names=()):
+    """
+    (versi ledger, {nama: versi cache_versions}) dalam satu query, untuk
+    ETag yang juga bergantung pada cache lain (mis. profil user).
+    """
+    subs = "".join(", (SELECT version FROM cache_versions WHERE name = %s)" for _ in names)
+    with db_cursor() as cur:
+        cur.execute(f"SELECT version{subs} FROM ledger_version WHERE id = 1", tuple(names))
+        row = cur.fetchone()
+    if not row:
+        return 0, {name: 0 for name in names}
+    return row[0], {name: v or 0 for name, v in zip(names, row[1:])}
+
+
+def request_version():
+    """
+    Versi ledger request ini: dari ETag (conditional_get) kalau sudah dibaca,
+    selain itu satu lookup lalu disimpan di g untuk sisa request.
+    """
+    if not has_app_context():
+        return current_version()
+    if g.get('ledger_version') is None:
+        g.ledger_version = current_version()
+    return g.ledger_version
+
+
+def write_through(cache, version, apply=None):
+    """
+    Update cache per worker (prefix_index, cube, katalog kategori) setelah
+    commit, dengan versi hasil bump_version(). Panggil di bawah lock cache itu.
+
+    Hanya kalau cache tepat satu versi di belakang: kalau worker lain sempat
+    menulis di antaranya, perubahan itu belum ada di cache, jadi cache
+    dibiarkan tertinggal dan pembacaan berikutnya membangun ulang (atau
+    membaca change log). apply(cache) dipanggil sebelum versinya dinaikkan;
+    None = versi naik tanpa perubahan isi. Kembalikan True kalau diterapkan.
+    """
+    if cache is None or cache.version != version - 1:
+        return False
+    if apply is not None:
+        apply(cache)
+    cache.version = version
+    return True
+
+
+# ==========================================
+# VERSI CACHE LAIN (TABEL cache_versions)
+# ==========================================
+# Sama dengan versi ledger, tapi per nama (users, ...) supaya perubahan
+# profil tidak membatalkan cache ledger.
+def bump_cache_version(cur, name):
+    cur.execute("UPDATE cache_versions SET version = LAST_INSERT_ID(version + 1) WHERE name = %s", (name,))
+    return cur.lastrowid
+
+
+def cache_version(cur, name):
+    cur.execute("SELECT version FROM cache_versions WHERE name = %s", (name,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+# ==========================================
+# ETAG + CONDITIONAL GET
+# ==========================================
+def _source_hash():
+    """SHA1 isi file .py dan templates/ aplikasi: sama di semua worker/node yang menjalankan kode yang sama."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(os.path.join(root, f) for f in os.listdir(root) if f.endswith(".py"))
+    for dirpath, _, files in os.walk(os.path.join(root, "templates")):
+        paths.extend(sorted(os.path.join(dirpath, f) for f in files))
+
+    h = hashlib.sha1()
+    for path in paths:
+        h.update(os.path.relpath(path, root).encode("utf-8"))
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+# Deploy baru (kode/template berubah) -> semua ETag lama tidak cocok lagi,
+# walaupun versi ledger belum naik. BUILD_ID bisa di-set dari pipeline deploy (mis. git SHA).
+BUILD_ID = os.environ.get("BUILD_ID") or _source_hash()
+
+
+def make_etag(version, user_key, *parts):
+    raw = "|".join(str(p) for p in (BUILD_ID, version, user_key, *parts))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def conditional_get(extra=None, caches=()):
+    """
+    Decorator untuk halaman baca. ETag diturunkan dari (BUILD_ID, versi ledger, user,
+    parameter filter, versi cache_versions `caches`, hasil extra()); kalau
+    cocok dengan If-None-Match langsung balas 304 tanpa query lain dan tanpa
+    render template. Versi ledger dan `caches` dibaca dalam satu query lalu
+    disimpan di g (ledger_version, cache_versions) untuk dipakai view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # View async (aio_db) juga didukung: ensure_sync menjalankannya di event loop
+            run_view = current_app.ensure_sync(view)
+            user_key = session.get('user_key')
+            # Belum login atau ada flash message yang harus tampil: render biasa
+            if not user_key or session.get('_flashes'):
+                return run_view(*args, **kwargs)
+
+            g.ledger_version, g.cache_versions = current_versions(caches)
+            etag = make_etag(
+                g.ledger_version, user_key, request.path,
+                sorted(request.args.items(multi=True)),
+                sorted(g.cache_versions.items()),
+                *(extra() if extra else ())
+            )
+
+            if etag in request.if_none_match:
+                resp = current_app.response_class(status=304)
+            else:
+                resp = make_response(run_view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+
+            resp.set_etag(etag)
+            resp.headers['Cache-Control'] = 'private, no-cache'
+            return resp
+        return wrapper
+    return decorator
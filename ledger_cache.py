@@ -0,0 +1,232 @@
+"""
+Cache ledger per worker, di-update inkremental.
+
+Load penuh sekali, lalu setiap kali versi ledger berubah hanya menarik delta:
+  - baris baru: id > id terbesar yang sudah dilihat
+  - baris terhapus: 'delete' di ledger_changes dengan version > versi cache
+    (kalau sudah terpotong kompaksi, load penuh ulang)
+
+Semua writer menaikkan versi ledger *sebelum* INSERT, jadi lock baris
+ledger_version membuat id baru selalu ter-commit berurutan dan tidak ada
+id kecil yang menyusul belakangan.
+
+Dipakai jalur baca yang menyentuh banyak baris: halaman /data (+ /data/more),
+export CSV/XLSX, snapshot /api/changes dan build engine kolumnar. Kalau versi
+ledger request sudah diketahui (ETag), halaman /data tidak query sama sekali.
+
+Kalau perkiraan memori melewati LEDGER_CACHE_MAX_MB, hari-hari tertua dibuang
+sampai ukurannya turun ke EVICT_TARGET dari batas. Cache lalu hanya lengkap
+untuk tanggal >= floor: rentang yang mulai sebelum floor (mis. filter 'all')
+kembali ke query SQL, rentang lain tetap dari cache.
+"""
+import bisect
+import os
+import sys
+import threading
+from collections import defaultdict
+from datetime import date as date_cls
+
+import change_log
+from db import db_cursor
+from ledger import current_version
+from models import Transaction
+from queries import (
+    MAX_PAGE_SIZE, PAGE_SIZE, TRANSACTION_COLUMNS,
+    date_bounds, decode_cursor, fetch_transactions, fetch_transactions_page, page_of,
+)
+
+MAX_BYTES = int(float(os.environ.get("LEDGER_CACHE_MAX_MB", 64)) * 1024 * 1024)
+EVICT_TARGET = 0.8          # setelah eviction, ukuran <= 80% batas (tidak evict tiap baris baru)
+
+
+def _intern(s):
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+def _row_size(t):
+    return sys.getsizeof(t) + sum(sys.getsizeof(v) for v in (t.id, t.day, t.desc, t.amount))
+
+
+def _desc_key(t):
+    # Urutan list: date DESC, id DESC -> kunci naik untuk bisect
+    return -t.day, -t.id
+
+
+class LedgerCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.rows = {}              # id -> Transaction (hanya yang bertanggal >= floor)
+        self.version = None
+        self.max_id = 0
+        self.bytes = 0
+        self.floor = 0              # ordinal; hari sebelum ini sudah di-evict
+        self.evictions = 0
+        self._sorted = None         # list terurut date DESC, id DESC (lazy)
+        self._lock = threading.Lock()
+
+    # --------------------------
+    # SINKRON DENGAN DB
+    # --------------------------
+    def sync(self, version=None):
+        """Tarik delta sampai versi sekarang."""
+        if version is None:
+            version = current_version()
+
+        with self._lock:
+            if self.version == version:
+                return
+            if self.version is None:
+                self._load_full(version)
+            else:
+                self._load_delta(version)
+
+    def _load_full(self, version):
+        self._pull_new()
+        self.version = version
+
+    def _load_delta(self, version):
+        self._pull_new()
+
+        try:
+            for c in change_log.iter_since(self.version, entity="transaction", op="delete"):
+                self._drop(int(c.key))
+        except change_log.ChangesExpired:
+            self._reset()
+            self._load_full(version)
+            return
+
+        self.version = version
+
+    def _pull_new(self, chunk=5000):
+        """Baris dengan id > max_id, per potongan keyset."""
+        while True:
+            with db_cursor(dictionary=True) as cur:
+                cur.execute(f"""
+                    SELECT {TRANSACTION_COLUMNS}
+                    FROM transactions
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (self.max_id, chunk))
+                rows = cur.fetchall()
+
+            for r in rows:
+                self._put(Transaction.from_row(r))
+            if len(rows) < chunk:
+                return
+
+    def _put(self, t):
+        self.max_id = max(self.max_id, t.id)
+        # Baris tanpa tanggal tidak pernah tampil; hari yang sudah di-evict tidak disimpan lagi
+        if not t.day or t.day < self.floor:
+            return
+
+        t = t._replace(type=_intern(t.type), usage=_intern(t.usage), by=_intern(t.by))
+        old = self.rows.get(t.id)
+        if old is not None:
+            self.bytes -= _row_size(old)
+        self.rows[t.id] = t
+        self.bytes += _row_size(t)
+        self._sorted = None
+
+        if self.bytes > self.max_bytes:
+            self._evict()
+
+    def _drop(self, tid):
+        old = self.rows.pop(tid, None)
+        if old is not None:
+            self.bytes -= _row_size(old)
+            self._sorted = None
+
+    def _evict(self):
+        """Buang hari-hari tertua sampai ukuran <= EVICT_TARGET x batas; floor ikut naik."""
+        per_day = defaultdict(int)
+        for t in self.rows.values():
+            per_day[t.day] += _row_size(t)
+
+        target = self.max_bytes * EVICT_TARGET
+        for day in sorted(per_day):
+            if self.bytes <= target:
+                break
+            self.bytes -= per_day[day]
+            self.floor = day + 1
+
+        self.rows = {tid: t for tid, t in self.rows.items() if t.day >= self.floor}
+        self.evictions += 1
+        self._sorted = None
+
+    def _reset(self):
+        self.rows = {}
+        self._sorted = None
+        self.bytes = 0
+        self.max_id = 0
+        self.floor = 0
+        self.version = None
+
+    # --------------------------
+    # BACA
+    # --------------------------
+    def between(self, start=None, end=None):
+        """
+        Transaksi [start, end] (None = tanpa batas) urut date DESC, id DESC,
+        sama dengan queries.fetch_transactions(); None kalau rentang itu
+        mulai sebelum floor (sebagian sudah di-evict).
+        """
+        lo = start.toordinal() if start else 1
+        hi = end.toordinal() if end else date_cls.max.toordinal()
+        with self._lock:
+            if self.floor and lo < self.floor:
+                return None
+            if self._sorted is None:
+                self._sorted = sorted(self.rows.values(), key=_desc_key)
+            i = bisect.bisect_left(self._sorted, (-hi, float("-inf")), key=_desc_key)
+            j = bisect.bisect_right(self._sorted, (-lo, float("inf")), key=_desc_key)
+            return self._sorted[i:j]
+
+    def stats(self):
+        return {
+            "rows": len(self.rows),
+            "version": self.version,
+            "max_id": self.max_id,
+            "approx_mb": round(self.bytes / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "floor": date_cls.fromordinal(self.floor).isoformat() if self.floor else None,
+            "evictions": self.evictions,
+        }
+
+
+_cache = LedgerCache()
+
+
+def get_cache():
+    return _cache
+
+
+def cached_filter(ftype, start_date=None, end_date=None, month=None, version=None):
+    """Transaksi satu filter dari cache; None kalau rentangnya di luar cache (pakai SQL)."""
+    bounds = date_bounds(ftype, start_date, end_date, month)
+    if bounds is None:
+        return []
+    _cache.sync(version)
+    return _cache.between(*bounds)
+
+
+def all_transactions(version=None):
+    """Semua transaksi bertanggal (urut date DESC, id DESC): dari cache, atau SQL kalau cache tidak lengkap."""
+    txns = cached_filter('all', version=version)
+    return txns if txns is not None else fetch_transactions('all')
+
+
+def transactions_page(ftype, start_date=None, end_date=None, month=None,
+                      cursor=None, limit=PAGE_SIZE, version=None):
+    """Sama dengan queries.fetch_transactions_page(), dari cache kalau rentangnya tercakup."""
+    rows = cached_filter(ftype, start_date, end_date, month, version)
+    if rows is None:
+        return fetch_transactions_page(ftype, start_date, end_date, month, cursor, limit)
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    i = 0
+    after = decode_cursor(cursor)
+    if after:
+        i = bisect.bisect_right(rows, (-after[0].toordinal(), -after[1]), key=_desc_key)
+    return page_of(rows[i:i + limit + 1], limit)
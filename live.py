@@ -0,0 +1,177 @@
+"""
+Push live ledger lewat Server-Sent Events (GET /api/stream).
+
+Satu Broker per proses:
+  - satu thread poller mengecek versi ledger (lookup primary key) setiap
+    POLL_INTERVAL detik, atau langsung setelah notify() dari writer di proses
+    yang sama; worker lain ketahuan lewat poll berikutnya
+  - kalau versi berubah, delta dibaca sekali dari change log (delta_sync),
+    baris di-render sekali, diserialisasi sekali, lalu disebar ke antrian
+    setiap koneksi
+  - koneksi yang antriannya penuh (klien lambat) diputus; EventSource otomatis
+    reconnect dengan Last-Event-ID dan mendapat susulan dari versi itu
+
+Koneksi SSE hampir selalu idle, tapi dengan worker sync setiap koneksi
+memegang satu thread. gunicorn.conf.py memakai worker gevent: monkey-patch
+membuat Queue.get / Event.wait dan socket mysql-connector (use_pure di
+db.DB_CONFIG) kooperatif, jadi koneksi idle tidak memakan thread OS.
+"""
+import json
+import queue
+import threading
+
+from flask import get_template_attribute
+
+import categories
+import delta_sync
+from ledger import current_version
+from models import Transaction, to_day
+from queries import local_today
+
+POLL_INTERVAL = 1.0
+HEARTBEAT = 15          # detik; komentar ": ping" supaya proxy tidak memutus koneksi idle
+MAX_PENDING = 20        # event tertunda per koneksi sebelum dianggap lambat
+MAX_LIVE_ROWS = 50      # delta lebih besar (mis. import CSV) -> suruh klien reload
+
+
+def _rupiah(amount):
+    return f"Rp {amount:,.0f}".replace(',', '.')
+
+
+def build_event(since):
+    """(versi, teks SSE) untuk perubahan setelah `since`. Butuh app context (render macro)."""
+    delta = delta_sync.changes_since(since)
+    upserts = delta["transactions"]["upsert"]
+
+    # Perubahan kategori (label baris, pilihan di modal) tidak bisa ditambal di klien: reload
+    if delta["reset"] or delta["more"] or delta["categories"] or len(upserts) > MAX_LIVE_ROWS:
+        payload = {"reload": True}
+    else:
+        recent_row = get_template_attribute('macros.html', 'recent_row')
+        transaction_row = get_template_attribute('macros.html', 'transaction_row')
+        ids = categories.get_catalogue().ids()
+        txns = [Transaction(r[0], to_day(r[1]) if r[1] else 0, ids.get(r[2]), *r[3:]) for r in upserts]
+        txns.sort(key=lambda t: (t.day, t.id), reverse=True)
+        totals = delta["totals"]
+        payload = {
+            "today": local_today().isoformat(),
+            "deleted": delta["transactions"]["delete"],
+            "rows": [
+                {"id": t.id, "date": t.date, "recent": str(recent_row(t)), "row": str(transaction_row(t))}
+                for t in txns
+            ],
+            "totals": {
+                "balance": _rupiah(totals["balance"]),
+                "today_in": _rupiah(totals["today_in"]),
+                "today_out": _rupiah(totals["today_out"]),
+            },
+        }
+
+    version = delta["version"]
+    return version, f"id: {version}\nevent: ledger\ndata: {json.dumps(payload)}\n\n"
+
+
+class _Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=MAX_PENDING)
+        self.dropped = False
+
+
+class Broker:
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.app = None
+        self.version = None
+        self._subs = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    # --------------------------
+    # LANGGANAN
+    # --------------------------
+    def subscribe(self):
+        sub = _Subscriber()
+        with self._lock:
+            self._subs.add(sub)
+            if self._thread is None:
+                # Poller hanya hidup selama ada pendengar
+                self.version = current_version()
+                self._thread = threading.Thread(target=self._run, name="live-broker", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def notify(self):
+        """Dipanggil writer setelah commit: cek versi sekarang tanpa menunggu interval."""
+        self._wake.set()
+
+    def publish(self, event):
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                sub.dropped = True
+                self.unsubscribe(sub)
+
+    def stats(self):
+        return {"subscribers": len(self._subs), "version": self.version,
+                "running": self._thread is not None}
+
+    # --------------------------
+    # POLLER
+    # --------------------------
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._subs:
+                    self._thread = None
+                    return
+            try:
+                version = current_version()
+                if version == self.version:
+                    continue
+                with self.app.app_context():
+                    new_version, event = build_event(self.version)
+                # Versi naik tanpa entri change log (mis. kategori sudah ada): tidak ada yang dikirim
+                if new_version != self.version:
+                    self.publish(event)
+                self.version = max(version, new_version)
+            except Exception:
+                # DB sempat putus dll.: coba lagi di putaran berikut
+                self.app.logger.exception("live broker")
+
+    # --------------------------
+    # STREAM PER KONEKSI
+    # --------------------------
+    def stream(self, last_event_id=None):
+        """Generator teks SSE untuk satu koneksi (bungkus dengan stream_with_context)."""
+        sub = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            # Reconnect: susulkan perubahan yang terlewat sejak event terakhir
+            if last_event_id is not None and last_event_id < current_version():
+                yield build_event(last_event_id)[1]
+
+            while not sub.dropped:
+                try:
+                    yield sub.queue.get(timeout=HEARTBEAT)
+                except queue.Empty:
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+
+broker = Broker()
@@ -0,0 +1,236 @@
+"""
+Migrasi skema MySQL.
+
+Jalankan sekali setiap deploy:  python migrations.py
+Setiap migrasi dicatat di tabel schema_migrations, jadi aman dijalankan ulang.
+"""
+from db import db_cursor
+import rollup
+import change_log
+import users
+import categories
+from importer import CONTENT_HASH_SQL
+
+# ==========================================
+# DAFTAR MIGRASI (URUT, JANGAN DIUBAH SETELAH DEPLOY)
+# ==========================================
+# Tiap langkah berupa string SQL atau fungsi yang menerima cursor.
+MIGRATIONS = [
+    ("0001_transactions_date_id_index", [
+        # Dipakai semua filter tanggal di /stats dan /data + ORDER BY date DESC, id DESC
+        "CREATE INDEX idx_transactions_date_id ON transactions (date, id)",
+    ]),
+    ("0002_daily_summary", [
+        """
+        CREATE TABLE daily_summary (
+            date DATE NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            usage_type VARCHAR(20) NOT NULL DEFAULT '',
+            category VARCHAR(100) NOT NULL DEFAULT '',
+            total DECIMAL(15,2) NOT NULL DEFAULT 0,
+            tx_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, type, usage_type, category)
+        )
+        """,
+        # Isi awal dengan skema saat itu (kolom category masih string);
+        # 0013 membangun ulang tabel ini dengan kunci category_id
+        """
+        INSERT INTO daily_summary (date, type, usage_type, category, total, tx_count)
+        SELECT date, type, COALESCE(usage_type, ''), COALESCE(category, ''), SUM(amount), COUNT(*)
+        FROM transactions
+        WHERE date IS NOT NULL
+        GROUP BY date, type, COALESCE(usage_type, ''), COALESCE(category, '')
+        """,
+    ]),
+    ("0003_ledger_version", [
+        """
+        CREATE TABLE ledger_version (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO ledger_version (id, version) VALUES (1, 0)",
+    ]),
+    ("0004_transaction_tombstones", [
+        # Dibaca ledger_cache untuk delta penghapusan: WHERE version > versi cache
+        """
+        CREATE TABLE transaction_tombstones (
+            version BIGINT NOT NULL,
+            txn_id INT NOT NULL,
+            deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version, txn_id)
+        )
+        """,
+    ]),
+    ("0005_transaction_months", [
+        """
+        CREATE TABLE transaction_months (
+            ym CHAR(7) PRIMARY KEY,
+            tx_count INT NOT NULL DEFAULT 0
+        )
+        """,
+        rollup.rebuild_months_sql,
+    ]),
+    ("0006_transactions_content_hash", [
+        # Dedupe import CSV (importer.py); baris lama di-backfill dengan rumus yang sama
+        "ALTER TABLE transactions ADD COLUMN content_hash CHAR(40) NULL",
+        # Rumus saat itu (label kategori); 0014 menghitung ulang dengan category_id
+        """
+        UPDATE transactions SET content_hash = SHA1(CONCAT_WS('|',
+            DATE_FORMAT(date, '%Y-%m-%d'),
+            CAST(ROUND(amount) AS SIGNED),
+            type,
+            COALESCE(usage_type, ''),
+            COALESCE(category, ''),
+            TRIM(COALESCE(description, ''))
+        ))
+        """,
+        "CREATE INDEX idx_transactions_content_hash ON transactions (content_hash)",
+    ]),
+    ("0007_sync_checkpoints", [
+        # Posisi terakhir konsumen change log (sheets_sync.py)
+        """
+        CREATE TABLE sync_checkpoints (
+            name VARCHAR(50) PRIMARY KEY,
+            last_id BIGINT NOT NULL DEFAULT 0,
+            last_version BIGINT NOT NULL DEFAULT 0,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    ("0008_ledger_changes", [
+        # Change log (change_log.py); menggantikan transaction_tombstones
+        """
+        CREATE TABLE ledger_changes (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            entity VARCHAR(20) NOT NULL,
+            op VARCHAR(10) NOT NULL,
+            entity_key VARCHAR(100) NOT NULL,
+            payload JSON NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_ledger_changes_version (version, id),
+            INDEX idx_ledger_changes_key (entity, entity_key)
+        )
+        """,
+        change_log.backfill_sql,
+        "DROP TABLE transaction_tombstones",
+        "ALTER TABLE ledger_version ADD COLUMN compacted_version BIGINT NOT NULL DEFAULT 0",
+    ]),
+    ("0009_idempotency_keys", [
+        # POST /api/transactions/batch: key dari klien -> id transaksi yang dibuat
+        """
+        CREATE TABLE idempotency_keys (
+            idem_key VARCHAR(64) PRIMARY KEY,
+            txn_id INT NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    ("0010_users", [
+        # Versi cache per proses selain ledger (users, ...): name -> angka yang naik tiap perubahan
+        """
+        CREATE TABLE cache_versions (
+            name VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO cache_versions (name, version) VALUES ('users', 1)",
+        """
+        CREATE TABLE users (
+            user_key VARCHAR(50) PRIMARY KEY,
+            username VARCHAR(50) NOT NULL UNIQUE,
+            pin_hash VARCHAR(255) NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            gender VARCHAR(10) NOT NULL DEFAULT 'female',
+            avatar_file VARCHAR(255) NULL,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+        users.seed_sql,
+    ]),
+    ("0011_category_ids", [
+        # Setiap langkah bisa diulang kalau migrasi terputus di tengah
+        lambda cur: add_column(cur, "categories", "id", "INT NOT NULL AUTO_INCREMENT UNIQUE FIRST"),
+        lambda cur: add_column(cur, "categories", "deleted_at", "DATETIME NULL"),
+        lambda cur: add_column(cur, "transactions", "category_id", column_type(cur, "categories", "id") + " NULL"),
+        categories.archive_orphan_labels_sql,
+    ]),
+    ("0012_category_ids_backfill", [
+        categories.backfill_ids,
+    ]),
+    ("0013_drop_category_label", [
+        # Baris yang masuk dari proses lama selama 0012 berjalan
+        categories.backfill_ids,
+        """
+        ALTER TABLE transactions
+            ADD CONSTRAINT fk_transactions_category FOREIGN KEY (category_id) REFERENCES categories (id),
+            DROP COLUMN category
+        """,
+        "DROP TABLE daily_summary",
+        """
+        CREATE TABLE daily_summary (
+            date DATE NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            usage_type VARCHAR(20) NOT NULL DEFAULT '',
+            category_id INT NOT NULL DEFAULT 0,
+            total DECIMAL(15,2) NOT NULL DEFAULT 0,
+            tx_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, type, usage_type, category_id)
+        )
+        """,
+        rollup.rebuild_sql,
+    ]),
+    ("0014_content_hash_category_id", [
+        # Hash dedupe dari category_id, bukan label: tidak berubah saat rename
+        f"UPDATE transactions SET content_hash = {CONTENT_HASH_SQL}",
+    ]),
+]
+
+
+def column_type(cur, table, column):
+    cur.execute("""
+        SELECT COLUMN_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def add_column(cur, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN, dilewati kalau kolomnya sudah ada."""
+    if column_type(cur, table, column) is None:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def applied_migrations(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(100) PRIMARY KEY,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("SELECT name FROM schema_migrations")
+    return {r[0] for r in cur.fetchall()}
+
+
+def apply_migrations(verbose=True):
+    with db_cursor(commit=True) as cur:
+        done = applied_migrations(cur)
+
+    for name, steps in MIGRATIONS:
+        if name in done:
+            continue
+        if verbose:
+            print(f"-> {name}")
+        with db_cursor(commit=True) as cur:
+            for step in steps:
+                if callable(step):
+                    step(cur)
+                else:
+                    cur.execute(step)
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+
+
+if __name__ == "__main__":
+    apply_migrations()
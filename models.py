@@ -0,0 +1,55 @@
+"""
+Record transaksi yang ringkas dan bertipe.
+
+Satu namedtuple dengan __slots__ kosong: nominal disimpan sebagai int rupiah
+(bukan float) dan tanggal sebagai ordinal int, jadi penjumlahan eksak dan
+perbandingan tanggal cukup perbandingan int.
+"""
+from collections import namedtuple
+from datetime import date as date_cls
+
+import categories
+
+
+class Transaction(namedtuple("Transaction", "id day category_id desc amount type usage by")):
+    __slots__ = ()
+
+    @property
+    def date_obj(self):
+        return date_cls.fromordinal(self.day) if self.day else None
+
+    @property
+    def date(self):
+        """'YYYY-MM-DD' untuk template dan JSON; '' kalau tanpa tanggal."""
+        return self.date_obj.isoformat() if self.day else ""
+
+    @property
+    def category(self):
+        """Label kategori dari katalog, jadi rename langsung terlihat tanpa menyentuh baris ini."""
+        return categories.get_catalogue().label(self.category_id)
+
+    @classmethod
+    def from_row(cls, r):
+        """Dari cursor dictionary=True dengan kolom queries.TRANSACTION_COLUMNS."""
+        return cls(
+            r["id"],
+            r["date"].toordinal() if r["date"] else 0,
+            r["category_id"],
+            r["desc"],
+            to_rupiah(r["amount"]),
+            r["type"],
+            r["usage"],
+            r["by"],
+        )
+
+
+def to_rupiah(amount):
+    """DECIMAL/float/str dari DB -> int rupiah."""
+    return int(round(amount)) if amount else 0
+
+
+def to_day(value):
+    """date atau 'YYYY-MM-DD' -> ordinal int."""
+    if isinstance(value, date_cls):
+        return value.toordinal()
+    return date_cls.fromisoformat(value).toordinal()
@@ -0,0 +1,178 @@
+"""
+Index prefix-sum per hari untuk total rentang tanggal O(1).
+
+cum[k][i] = total kolom k dari hari pertama sampai hari (base + i), inklusif.
+Total rentang [s, e] = cum[e] - cum[s - 1]: dua lookup dan satu pengurangan.
+
+Index dibangun dari rollup daily_summary (satu baris per hari) dan di-update
+langsung oleh add/delete di worker ini. Perubahan dari worker lain dideteksi
+lewat versi ledger (ledger.current_version), lalu index dibangun ulang.
+"""
+import threading
+from array import array
+from datetime import date as date_cls
+
+from db import db_cursor
+from ledger import current_version, write_through
+from queries import date_bounds
+
+# Urutan kolom di array kumulatif
+IN, OUT, PRIBADI, BISNIS = range(4)
+
+
+def _columns(type_, usage):
+    cols = [IN] if type_ == 'in' else [OUT]
+    if type_ == 'out' and usage == 'pribadi':
+        cols.append(PRIBADI)
+    elif type_ == 'out' and usage == 'bisnis':
+        cols.append(BISNIS)
+    return cols
+
+
+class PrefixSumIndex:
+    def __init__(self):
+        self.base = None            # ordinal hari pertama
+        self.cum = [array('q') for _ in range(4)]
+        self.version = None         # versi ledger saat index dibangun
+
+    def __len__(self):
+        return len(self.cum[0])
+
+    @classmethod
+    def from_daily_rows(cls, rows, version=None):
+        """rows: (date, in, out, pribadi, bisnis) urut naik per tanggal."""
+        idx = cls()
+        idx.version = version
+        running = [0, 0, 0, 0]
+        for d, *totals in rows:
+            o = d.toordinal()
+            if idx.base is None:
+                idx.base = o
+            idx._extend_to(o)
+            for k in range(4):
+                running[k] += int(round(totals[k]))
+                idx.cum[k][-1] = running[k]
+        return idx
+
+    # --------------------------
+    # UPDATE
+    # --------------------------
+    def _extend_to(self, o):
+        """Tambah hari sampai ordinal o, meneruskan nilai kumulatif terakhir."""
+        while self.base + len(self) <= o:
+            for col in self.cum:
+                col.append(col[-1] if col else 0)
+
+    def add(self, d, type_, usage, amount):
+        """O(1) untuk hari terakhir (kasus normal: transaksi hari ini)."""
+        o = _ordinal(d)
+        amount = int(round(amount))
+        if self.base is None:
+            self.base = o
+        elif o < self.base:
+            shift = self.base - o
+            self.cum = [array('q', [0] * shift) + col for col in self.cum]
+            self.base = o
+        self._extend_to(o)
+
+        start = o - self.base
+        for k in _columns(type_, usage):
+            col = self.cum[k]
+            for i in range(start, len(col)):
+                col[i] += amount
+
+    def remove(self, d, type_, usage, amount):
+        self.add(d, type_, usage, -amount)
+
+    # --------------------------
+    # QUERY
+    # --------------------------
+    def _prefix(self, k, o):
+        """Kumulatif kolom k sampai ordinal o (inklusif)."""
+        if self.base is None or o < self.base:
+            return 0
+        i = min(o - self.base, len(self) - 1)
+        return self.cum[k][i]
+
+    def range_totals(self, start=None, end=None):
+        """(in, out, pribadi, bisnis) untuk [start, end]; None = tanpa batas."""
+        if self.base is None:
+            return 0, 0, 0, 0
+        s = _ordinal(start) if start else self.base
+        e = _ordinal(end) if end else self.base + len(self) - 1
+        if s > e:
+            return 0, 0, 0, 0
+        return tuple(self._prefix(k, e) - self._prefix(k, s - 1) for k in range(4))
+
+
+def _ordinal(d):
+    return d.toordinal() if isinstance(d, date_cls) else date_cls.fromisoformat(d).toordinal()
+
+
+# ==========================================
+# INDEX PER WORKER
+# ==========================================
+_index = None
+_lock = threading.Lock()
+
+
+def _load(version):
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT
+                date,
+                COALESCE(SUM(CASE WHEN type = 'in' THEN total END), 0),
+                COALESCE(SUM(CASE WHEN type = 'out' THEN total END), 0),
+                COALESCE(SUM(CASE WHEN type = 'out' AND usage_type = 'pribadi' THEN total END), 0),
+                COALESCE(SUM(CASE WHEN type = 'out' AND usage_type = 'bisnis' THEN total END), 0)
+            FROM daily_summary
+            GROUP BY date
+            ORDER BY date
+        """)
+        return PrefixSumIndex.from_daily_rows(cur.fetchall(), version)
+
+
+def get_index(version=None):
+    """Index untuk versi ledger sekarang; dibangun ulang kalau tertinggal."""
+    global _index
+    if version is None:
+        version = current_version()
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = _load(version)
+        return _index
+
+
+def fetch_stats_indexed(ftype, start_date=None, end_date=None, month=None, version=None):
+    """Sama dengan queries.fetch_stats(), tapi dari prefix-sum."""
+    bounds = date_bounds(ftype, start_date, end_date, month)
+    if bounds is None:
+        return 0, 0, 0, 0, 0
+
+    idx = get_index(version)
+    with _lock:
+        tin, tout, p, b = idx.range_totals(*bounds)
+    return tin - tout, tin, tout, p, b
+
+
+def dashboard_totals(today, version=None):
+    """(saldo all-time, masuk hari ini, keluar hari ini) dari satu index."""
+    idx = get_index(version)
+    with _lock:
+        all_in, all_out, _, _ = idx.range_totals()
+        d_in, d_out, _, _ = idx.range_totals(today, today)
+    return all_in - all_out, d_in, d_out
+
+
+def record_insert(version, d, type_, usage, amount):
+    """Panggil setelah commit, dengan versi hasil bump_version()."""
+    _apply(version, d, type_, usage, amount)
+
+
+def record_delete(version, d, type_, usage, amount):
+    _apply(version, d, type_, usage, -amount)
+
+
+def _apply(version, d, type_, usage, amount):
+    with _lock:
+        write_through(_index, version, None if d is None else lambda idx: idx.add(d, type_, usage, amount))
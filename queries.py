@@ -0,0 +1,255 @@
+from datetime import datetime, timedelta, date as date_cls
+
+from db import db_cursor
+from models import Transaction, to_rupiah
+
+# ==========================================
+# TANGGAL LOKAL (GMT+8 KONSISTEN DENGAN INSERT)
+# ==========================================
+def local_today():
+    return (datetime.utcnow() + timedelta(hours=8)).date()
+
+
+def _to_date(value):
+    if isinstance(value, date_cls):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def month_bounds(month):
+    """'2026-02' -> (2026-02-01, 2026-03-01), atau None kalau format salah."""
+    try:
+        first = datetime.strptime(month, "%Y-%m").date()
+    except (TypeError, ValueError):
+        return None
+    if first.month == 12:
+        return first, first.replace(year=first.year + 1, month=1)
+    return first, first.replace(month=first.month + 1)
+
+
+# ==========================================
+# QUERY BUILDER FILTER TANGGAL
+# ==========================================
+FILTERS = ('today', 'yesterday', 'single', 'range', 'month', 'all')
+
+
+def date_bounds(ftype, start_date=None, end_date=None, month=None):
+    """
+    Terjemahkan ftype (today/yesterday/single/range/month/all) jadi rentang
+    tanggal inklusif (start, end). 'all' -> (None, None); filter yang tidak
+    lengkap -> None, sama seperti filter_transactions() yang mengembalikan
+    list kosong.
+    """
+    today = local_today()
+
+    if ftype == 'today':
+        return today, today
+
+    if ftype == 'yesterday':
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+
+    if ftype == 'single' and start_date:
+        d = _to_date(start_date)
+        if d:
+            return d, d
+
+    elif ftype == 'range' and start_date and end_date:
+        s, e = _to_date(start_date), _to_date(end_date)
+        if s and e:
+            return s, e
+
+    elif ftype == 'month' and month:
+        bounds = month_bounds(month)
+        if bounds:
+            return bounds[0], bounds[1] - timedelta(days=1)
+
+    elif ftype == 'all':
+        return None, None
+
+    return None
+
+
+def date_filter_clause(ftype, start_date=None, end_date=None, month=None, column="date"):
+    """
+    (sql, params) untuk dipasang setelah WHERE. Semua bentuknya range
+    pada kolom tanggal supaya bisa memakai index (date, id).
+    """
+    bounds = date_bounds(ftype, start_date, end_date, month)
+
+    if bounds is None:
+        return "1 = 0", ()
+    if bounds == (None, None):
+        # filter_transactions() juga melewati baris tanpa tanggal
+        return f"{column} IS NOT NULL", ()
+
+    start, end = bounds
+    if start == end:
+        return f"{column} = %s", (start,)
+    return f"{column} BETWEEN %s AND %s", (start, end)
+
+
+# ==========================================
+# FETCH TRANSAKSI
+# ==========================================
+TRANSACTION_COLUMNS = """
+    id,
+    date,
+    category_id,
+    description AS `desc`,
+    amount,
+    type,
+    usage_type AS `usage`,
+    created_by AS `by`
+"""
+
+
+def row_to_transaction(r):
+    return Transaction.from_row(r)
+
+
+def fetch_transactions(ftype, start_date=None, end_date=None, month=None):
+    where, params = date_filter_clause(ftype, start_date, end_date, month)
+
+    with db_cursor(dictionary=True) as cur:
+        cur.execute(f"""
+            SELECT {TRANSACTION_COLUMNS}
+            FROM transactions
+            WHERE {where}
+            ORDER BY date DESC, id DESC
+        """, params)
+        rows = cur.fetchall()
+
+    return [row_to_transaction(r) for r in rows]
+
+
+# ==========================================
+# KEYSET PAGINATION (date DESC, id DESC)
+# ==========================================
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(t):
+    return f"{t.date}_{t.id}"
+
+
+def decode_cursor(cursor):
+    """'2026-02-14_123' -> (date, 123); cursor rusak -> None (halaman pertama)."""
+    try:
+        d, tid = cursor.split('_', 1)
+        return datetime.strptime(d, "%Y-%m-%d").date(), int(tid)
+    except (AttributeError, ValueError):
+        return None
+
+
+def fetch_transactions_page(ftype, start_date=None, end_date=None, month=None,
+                            cursor=None, limit=PAGE_SIZE):
+    """
+    Satu halaman transaksi setelah cursor. Mengembalikan (rows, next_cursor);
+    next_cursor None berarti sudah halaman terakhir.
+    """
+    sql, params, limit = page_query(ftype, start_date, end_date, month, cursor, limit)
+    with db_cursor(dictionary=True) as cur:
+        cur.execute(sql, params)
+        return page_result(cur.fetchall(), limit)
+
+
+def page_query(ftype, start_date=None, end_date=None, month=None, cursor=None, limit=PAGE_SIZE):
+    """(sql, params, limit) satu halaman; dipakai versi sync dan async."""
+    where, params = date_filter_clause(ftype, start_date, end_date, month)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    after = decode_cursor(cursor)
+    if after:
+        where += " AND (date < %s OR (date = %s AND id < %s))"
+        params = (*params, after[0], after[0], after[1])
+
+    sql = f"""
+        SELECT {TRANSACTION_COLUMNS}
+        FROM transactions
+        WHERE {where}
+        ORDER BY date DESC, id DESC
+        LIMIT %s
+    """
+    return sql, (*params, limit + 1), limit
+
+
+def page_result(raw_rows, limit):
+    """Baris mentah (limit + 1) -> (rows, next_cursor)."""
+    return page_of([row_to_transaction(r) for r in raw_rows], limit)
+
+
+def page_of(rows, limit):
+    """Transaction (limit + 1) -> (rows, next_cursor); dipakai juga oleh ledger_cache."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+# ==========================================
+# AGREGASI DARI ROLLUP daily_summary
+# ==========================================
+def fetch_stats(ftype, start_date=None, end_date=None, month=None):
+    """
+    Hitung total dalam satu query ter-grup di atas daily_summary, hasilnya
+    sama dengan calculate_stats(): (balance, total_in, total_out, out_pribadi, out_bisnis).
+    """
+    with db_cursor() as cur:
+        cur.execute(*stats_query(ftype, start_date, end_date, month))
+        return stats_result(cur.fetchone())
+
+
+def stats_query(ftype, start_date=None, end_date=None, month=None):
+    where, params = date_filter_clause(ftype, start_date, end_date, month)
+    sql = f"""
+        SELECT
+            COALESCE(SUM(CASE WHEN type = 'in' THEN total END), 0),
+            COALESCE(SUM(CASE WHEN type = 'out' THEN total END), 0),
+            COALESCE(SUM(CASE WHEN type = 'out' AND usage_type = 'pribadi' THEN total END), 0),
+            COALESCE(SUM(CASE WHEN type = 'out' AND usage_type = 'bisnis' THEN total END), 0)
+        FROM daily_summary
+        WHERE {where}
+    """
+    return sql, params
+
+
+def stats_result(row):
+    # SUM(DECIMAL) -> int rupiah, sama dengan models.Transaction: total tetap eksak
+    total_in, total_out, out_pribadi, out_bisnis = (to_rupiah(v) for v in row)
+    return total_in - total_out, total_in, total_out, out_pribadi, out_bisnis
+
+
+# Daftar bulan berubah hanya kalau ledger berubah: simpan per versi ledger
+_months_cache = (None, None)
+
+MONTHS_SQL = "SELECT ym FROM transaction_months ORDER BY ym DESC"
+
+
+def cached_months(version):
+    cached_version, months = _months_cache
+    if version is not None and version == cached_version:
+        return months
+    return None
+
+
+def remember_months(version, months):
+    global _months_cache
+    if version is not None:
+        _months_cache = (version, months)
+    return months
+
+
+def fetch_available_months(version=None):
+    """Bulan yang punya transaksi, terbaru dulu, dari index transaction_months."""
+    months = cached_months(version)
+    if months is not None:
+        return months
+
+    with db_cursor() as cur:
+        cur.execute(MONTHS_SQL)
+        return remember_months(version, [r[0] for r in cur.fetchall()])
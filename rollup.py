@@ -0,0 +1,152 @@
+"""
+Rollup harian daily_summary, kunci (date, type, usage_type, category_id),
+plus index bulan transaction_months (ym, tx_count) untuk dropdown bulan.
+
+Tabel ini di-update di transaksi DB yang sama dengan INSERT/DELETE
+transactions, jadi selalu sinkron. Kalau ragu, cek / bangun ulang:
+
+    python rollup.py verify
+    python rollup.py rebuild
+"""
+import sys
+from collections import defaultdict
+
+from db import db_cursor
+
+# Sumber kebenaran untuk rebuild/verify: raw transactions di-grup per kunci rollup
+_GROUPED_RAW = """
+    SELECT
+        date,
+        type,
+        COALESCE(usage_type, '') AS usage_type,
+        COALESCE(category_id, 0) AS category_id,
+        SUM(amount) AS total,
+        COUNT(*) AS tx_count
+    FROM transactions
+    WHERE date IS NOT NULL
+    GROUP BY date, type, COALESCE(usage_type, ''), COALESCE(category_id, 0)
+"""
+
+
+# ==========================================
+# UPDATE INKREMENTAL (DIPANGGIL DI DALAM TRANSAKSI ROUTE)
+# ==========================================
+def apply_delta(cur, date, type_, usage, category_id, amount, count):
+    cur.execute("""
+        INSERT INTO daily_summary (date, type, usage_type, category_id, total, tx_count)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total = total + VALUES(total),
+            tx_count = tx_count + VALUES(tx_count)
+    """, (date, type_, usage or '', category_id or 0, amount, count))
+
+    if count < 0:
+        cur.execute("""
+            DELETE FROM daily_summary
+            WHERE date = %s AND type = %s AND usage_type = %s AND category_id = %s
+              AND tx_count <= 0
+        """, (date, type_, usage or '', category_id or 0))
+
+    apply_month_delta(cur, date, count)
+
+
+def apply_month_delta(cur, date, count):
+    ym = str(date)[:7]
+    cur.execute("""
+        INSERT INTO transaction_months (ym, tx_count) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE tx_count = tx_count + VALUES(tx_count)
+    """, (ym, count))
+    if count < 0:
+        cur.execute("DELETE FROM transaction_months WHERE ym = %s AND tx_count <= 0", (ym,))
+
+
+def record_insert(cur, date, type_, usage, category_id, amount):
+    apply_delta(cur, date, type_, usage, category_id, amount, 1)
+
+
+def record_inserts(cur, rows):
+    """
+    Banyak INSERT sekaligus (import CSV, batch API): rows berisi
+    (date, type, usage_type, category_id, amount); satu upsert per kunci rollup.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for date, type_, usage, category_id, amount in rows:
+        delta = deltas[(date, type_, usage, category_id)]
+        delta[0] += amount
+        delta[1] += 1
+    for (date, type_, usage, category_id), (total, count) in deltas.items():
+        apply_delta(cur, date, type_, usage, category_id, total, count)
+
+
+def record_delete(cur, row):
+    """row: dict hasil SELECT date, type, usage_type, category_id, amount."""
+    if row['date'] is None:
+        return
+    apply_delta(cur, row['date'], row['type'], row['usage_type'], row['category_id'], -row['amount'], -1)
+
+
+# ==========================================
+# REBUILD / VERIFY
+# ==========================================
+def rebuild_sql(cur):
+    cur.execute("DELETE FROM daily_summary")
+    cur.execute(f"""
+        INSERT INTO daily_summary (date, type, usage_type, category_id, total, tx_count)
+        {_GROUPED_RAW}
+    """)
+
+
+_GROUPED_MONTHS = """
+    SELECT DATE_FORMAT(date, '%Y-%m') AS ym, COUNT(*) AS tx_count
+    FROM transactions
+    WHERE date IS NOT NULL
+    GROUP BY ym
+"""
+
+
+def rebuild_months_sql(cur):
+    cur.execute("DELETE FROM transaction_months")
+    cur.execute(f"INSERT INTO transaction_months (ym, tx_count) {_GROUPED_MONTHS}")
+
+
+def rebuild():
+    with db_cursor(commit=True) as cur:
+        rebuild_sql(cur)
+        rebuild_months_sql(cur)
+
+
+def verify():
+    """Kembalikan daftar selisih (key, raw, rollup); list kosong berarti cocok."""
+    with db_cursor() as cur:
+        cur.execute(_GROUPED_RAW)
+        raw = {tuple(r[:4]): (r[4], r[5]) for r in cur.fetchall()}
+        cur.execute("SELECT date, type, usage_type, category_id, total, tx_count FROM daily_summary")
+        rolled = {tuple(r[:4]): (r[4], r[5]) for r in cur.fetchall()}
+
+        cur.execute(_GROUPED_MONTHS)
+        raw.update({(r[0],): (None, r[1]) for r in cur.fetchall()})
+        cur.execute("SELECT ym, tx_count FROM transaction_months")
+        rolled.update({(r[0],): (None, r[1]) for r in cur.fetchall()})
+
+    mismatches = []
+    for key in raw.keys() | rolled.keys():
+        if raw.get(key) != rolled.get(key):
+            mismatches.append((key, raw.get(key), rolled.get(key)))
+    return sorted(mismatches, key=lambda m: tuple(str(k) for k in m[0]))
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "verify"
+
+    if cmd == "rebuild":
+        rebuild()
+        print("daily_summary + transaction_months dibangun ulang")
+    elif cmd == "verify":
+        diff = verify()
+        for key, raw, rolled in diff:
+            print(f"{key}: raw={raw} rollup={rolled}")
+        print("OK, cocok" if not diff else f"{len(diff)} selisih")
+        sys.exit(1 if diff else 0)
+    else:
+        print("pakai: python rollup.py [verify|rebuild]")
+        sys.exit(2)
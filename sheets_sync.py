@@ -0,0 +1,240 @@
+"""
+Mirror transaksi ke Google Sheets di background.
+
+Jalan sebagai proses terpisah (bukan di request path):
+
+    python sheets_sync.py            # loop terus, ke sheet SHEET_NAME
+    python sheets_sync.py --once     # satu putaran lalu keluar
+    python sheets_sync.py --fake     # pakai FakeSheet lokal, untuk coba-coba
+
+Change log yang dibaca:
+  - insert: transactions dengan id > checkpoint.last_id
+  - delete: 'delete' transaksi di ledger_changes dengan version > checkpoint.last_version
+Perubahan dikumpulkan lalu dikirim sekaligus: satu append_rows untuk semua
+baris baru, satu batch_update untuk mengosongkan baris yang dihapus. Baris
+yang ditambah lalu dihapus sebelum sempat terkirim tidak dikirim sama sekali.
+Error 429/5xx dari Google di-retry dengan exponential backoff + jitter;
+checkpoint baru disimpan setelah push berhasil.
+"""
+import argparse
+import os
+import random
+import time
+
+import categories
+import change_log
+from db import db_cursor
+
+# Konfigurasi di sini (bukan di main.py), supaya worker tidak ikut memuat app Flask
+SHEET_NAME = os.environ.get("SHEET_NAME", "CashflowDB")
+GOOGLE_CREDS_PATH = os.environ.get("GOOGLE_CREDS_PATH", "/var/www/cashflow/credentials.json")
+
+CHECKPOINT_NAME = "google_sheets"
+BATCH_SIZE = 500
+POLL_INTERVAL = 10          # detik antar putaran kalau tidak ada perubahan
+MAX_RETRIES = 6
+
+HEADER = ["id", "date", "category", "description", "amount", "type", "usage", "created_by"]
+
+
+# ==========================================
+# CLIENT SHEETS
+# ==========================================
+def open_sheet():
+    import gspread
+
+    return gspread.service_account(filename=GOOGLE_CREDS_PATH).open(SHEET_NAME).sheet1
+
+
+class FakeSheet:
+    """Pengganti worksheet gspread di memori (append_rows, batch_update, col_values)."""
+
+    def __init__(self, fail_times=0):
+        self.rows = []
+        self.calls = []
+        self.fail_times = fail_times    # simulasi 429 untuk uji backoff
+
+    def _maybe_fail(self):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RateLimited()
+
+    def col_values(self, col):
+        return [r[col - 1] if len(r) >= col else "" for r in self.rows]
+
+    def append_rows(self, values, value_input_option="RAW"):
+        self._maybe_fail()
+        self.calls.append(("append_rows", len(values)))
+        self.rows.extend([list(v) for v in values])
+
+    def batch_update(self, data, value_input_option="RAW"):
+        self._maybe_fail()
+        self.calls.append(("batch_update", len(data)))
+        for item in data:
+            row = int(item["range"].split(":")[0][1:])
+            self.rows[row - 1] = list(item["values"][0])
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def _is_retryable(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status in (429, 500, 502, 503, 504)
+
+
+def with_backoff(fn, *args, retries=MAX_RETRIES, base=1.0, cap=64.0, sleep=time.sleep, **kwargs):
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as exc:
+            if attempt == retries or not _is_retryable(exc):
+                raise
+            sleep(min(cap, base * 2 ** attempt) * (0.5 + random.random() / 2))
+
+
+# ==========================================
+# CHECKPOINT + CHANGE LOG
+# ==========================================
+def load_checkpoint():
+    with db_cursor() as cur:
+        cur.execute("SELECT last_id, last_version FROM sync_checkpoints WHERE name = %s", (CHECKPOINT_NAME,))
+        row = cur.fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def save_checkpoint(last_id, last_version):
+    with db_cursor(commit=True) as cur:
+        cur.execute("""
+            INSERT INTO sync_checkpoints (name, last_id, last_version) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), last_version = VALUES(last_version)
+        """, (CHECKPOINT_NAME, last_id, last_version))
+
+
+def read_changes(last_id, last_version, limit=BATCH_SIZE):
+    """
+    (baris baru, [(version, txn_id) terhapus], versi dasar) setelah checkpoint.
+    Delete untuk id yang insert-nya belum terbaca (di luar batch ini)
+    ditahan ke putaran berikut (mulai dari versinya), supaya tidak ada
+    baris yang muncul lagi.
+    """
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT id, date, category_id, description, amount, type, usage_type, created_by
+            FROM transactions
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, limit))
+        inserts = cur.fetchall()
+    seen_id = inserts[-1][0] if len(inserts) == limit else None
+
+    try:
+        changes, _ = change_log.read_since(last_version, limit, entity="transaction", op="delete")
+    except change_log.ChangesExpired as e:
+        # Sheet baru (belum ada baris yang dikirim): delete lama tidak relevan
+        if last_id:
+            raise
+        last_version = e.horizon
+        changes, _ = change_log.read_since(last_version, limit, entity="transaction", op="delete")
+
+    deletes = [(c.version, int(c.key)) for c in changes]
+    if seen_id is not None:
+        held = [v for v, tid in deletes if tid > seen_id]
+        if held:
+            deletes = [(v, tid) for v, tid in deletes if v < held[0]]
+    return inserts, deletes, last_version
+
+
+def _sheet_row(r, catalogue):
+    tid, d, category_id, desc, amount, type_, usage, by = r
+    category = catalogue.label(category_id)
+    return [str(tid), d.isoformat() if d else "", category or "", desc or "",
+            int(round(amount)) if amount is not None else 0, type_ or "", usage or "", by or ""]
+
+
+# ==========================================
+# SYNC
+# ==========================================
+class SheetsSync:
+    def __init__(self, sheet, sleep=time.sleep):
+        self.sheet = sheet
+        self.sleep = sleep
+        self.row_of = None          # id (str) -> nomor baris di sheet
+        self.next_row = None
+
+    def _load_layout(self):
+        ids = with_backoff(self.sheet.col_values, 1, sleep=self.sleep)
+        if not ids:
+            with_backoff(self.sheet.append_rows, [HEADER], sleep=self.sleep)
+            ids = [HEADER[0]]
+        self.row_of = {v: i + 1 for i, v in enumerate(ids) if v}
+        self.next_row = len(ids) + 1
+
+    def run_once(self):
+        """Satu putaran; kembalikan jumlah perubahan yang diproses."""
+        if self.row_of is None:
+            self._load_layout()
+
+        last_id, last_version = load_checkpoint()
+        inserts, deletes, base_version = read_changes(last_id, last_version)
+        if not inserts and not deletes:
+            if base_version != last_version:
+                save_checkpoint(last_id, base_version)
+            return 0
+
+        deleted_ids = {str(tid) for _, tid in deletes}
+        # Gabungkan: baris yang sudah dihapus tidak perlu di-append. Id yang
+        # sudah ada di sheet (crash sebelum checkpoint tersimpan) dilewati.
+        catalogue = categories.get_catalogue()
+        catalogue.sync()
+        new_rows = [_sheet_row(r, catalogue) for r in inserts
+                    if str(r[0]) not in deleted_ids and str(r[0]) not in self.row_of]
+        clear = [self.row_of[tid] for tid in deleted_ids if tid in self.row_of]
+
+        if new_rows:
+            with_backoff(self.sheet.append_rows, new_rows, value_input_option="RAW", sleep=self.sleep)
+            for row in new_rows:
+                self.row_of[row[0]] = self.next_row
+                self.next_row += 1
+
+        if clear:
+            blank = [""] * len(HEADER)
+            end_col = chr(ord("A") + len(HEADER) - 1)
+            with_backoff(self.sheet.batch_update, [
+                {"range": f"A{n}:{end_col}{n}", "values": [blank]} for n in sorted(clear)
+            ], value_input_option="RAW", sleep=self.sleep)
+            for tid in deleted_ids:
+                self.row_of.pop(tid, None)
+
+        save_checkpoint(
+            inserts[-1][0] if inserts else last_id,
+            deletes[-1][0] if deletes else base_version,
+        )
+        return len(inserts) + len(deletes)
+
+    def run_forever(self, interval=POLL_INTERVAL):
+        while True:
+            # Masih ada sisa batch: langsung lanjut, kalau kosong tunggu
+            if not self.run_once():
+                self.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sinkron transaksi ke Google Sheets")
+    parser.add_argument("--once", action="store_true")
+    parser.add_argument("--fake", action="store_true", help="pakai FakeSheet lokal")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    sync = SheetsSync(FakeSheet() if args.fake else open_sheet())
+    if args.once:
+        while sync.run_once():
+            pass
+        if args.fake:
+            print(f"{len(sync.sheet.rows)} baris di FakeSheet, panggilan: {sync.sheet.calls}")
+    else:
+        sync.run_forever(args.interval)
@@ -0,0 +1,28 @@
+"""
+Tes unit untuk fungsi murni (parsing, index, cube, forecast); tidak butuh
+MySQL. Jalankan dari root repo:
+
+    python -m pytest
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import categories  # noqa: E402
+
+CATEGORY_NAMES = ["🛍️ Belanja", "🍔 Makan", "🚕 Transport"]
+
+
+@pytest.fixture
+def catalogue(monkeypatch):
+    """Katalog kategori tanpa DB: id 1.. untuk CATEGORY_NAMES, ✨ Income terarsip."""
+    cat = categories.CategoryCatalogue()
+    for cid, name in enumerate(CATEGORY_NAMES + [categories.INCOME_CATEGORY], start=1):
+        cat._apply("insert", {"id": cid, "name": name})
+    cat._apply("delete", {"id": len(CATEGORY_NAMES) + 1, "name": categories.INCOME_CATEGORY})
+    monkeypatch.setattr(cat, "sync", lambda version=None: None)
+    monkeypatch.setattr(categories, "_catalogue", cat)
+    return cat
@@ -0,0 +1,33 @@
+from datetime import date
+
+from columnar import ColumnarLedger
+from models import Transaction
+
+DAY = date(2026, 2, 14).toordinal()
+BIG = 2 ** 53 + 1          # di atas presisi float64
+
+
+def ledger(*rows):
+    return ColumnarLedger.from_transactions([
+        Transaction(i, DAY, category_id, "", amount, type_, usage, "Sisil")
+        for i, (category_id, amount, type_, usage) in enumerate(rows, start=1)
+    ])
+
+
+def test_stats_exact_above_float_precision():
+    lg = ledger((4, BIG, "in", "bisnis"), (4, 2, "in", "bisnis"), (1, 3, "out", "pribadi"))
+    assert lg.stats() == (BIG + 2 - 3, BIG + 2, 3, 3, 0)
+    assert all(type(v) is int for v in lg.stats())
+
+
+def test_by_category_exact_above_float_precision():
+    lg = ledger((1, BIG, "out", "pribadi"), (1, 2, "out", "bisnis"), (2, 5, "out", "pribadi"),
+                (4, 9, "in", "bisnis"))
+    assert lg.by_category() == {1: BIG + 2, 2: 5}
+    assert lg.by_category(type_="in") == {4: 9}
+
+
+def test_stats_with_mask():
+    lg = ledger((1, 1000, "out", "pribadi"), (2, 500, "out", "bisnis"))
+    mask = lg.ids == 2
+    assert lg.stats(mask) == (-500, 0, 500, 0, 500)
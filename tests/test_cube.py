@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+
+import cube
+from cube import Cube, by_category, month_trend, top_n
+
+
+@pytest.fixture
+def c():
+    # (date, category_id, type, usage_type, total) seperti daily_summary
+    return Cube.from_rows([
+        (date(2026, 1, 15), 1, "out", "pribadi", 40000),
+        (date(2026, 1, 31), 2, "out", "pribadi", 10000),
+        (date(2026, 2, 1), 2, "out", "bisnis", 5000),
+        (date(2026, 2, 1), 4, "in", "bisnis", 900000),
+        (date(2026, 2, 28), 3, "out", "pribadi", 20000),
+        (date(2026, 3, 2), 1, "out", "pribadi", 8000),
+    ], version=3)
+
+
+def test_cells_whole_months_and_edges(c):
+    all_cells = c.cells()
+    assert all_cells[(1, "out", "pribadi")] == 48000
+    assert all_cells[(4, "in", "bisnis")] == 900000
+
+    # Februari penuh dari level bulan, pinggir Januari/Maret dari level hari
+    feb = c.cells(date(2026, 2, 1), date(2026, 2, 28))
+    assert dict(feb) == {(2, "out", "bisnis"): 5000, (4, "in", "bisnis"): 900000, (3, "out", "pribadi"): 20000}
+    edges = c.cells(date(2026, 1, 31), date(2026, 3, 1))
+    assert edges[(2, "out", "pribadi")] == 10000
+    assert (1, "out", "pribadi") not in edges
+
+
+def test_cells_outside_range(c):
+    assert not c.cells(date(2025, 1, 1), date(2025, 12, 31))
+    assert not c.cells(date(2026, 3, 3))
+    assert not Cube().cells()
+
+
+def test_add_remove_drops_empty_cells(c):
+    c.remove(date(2026, 3, 2), 1, "out", "pribadi", 8000)
+    assert c.latest_month() == (2026, 2)
+    assert (2026, 3) not in c.months
+    c.add("2026-03-05", None, "out", None, 1000)
+    assert c.cells(date(2026, 3, 1))[(0, "out", "")] == 1000
+
+
+def test_by_category_and_top_n(c):
+    totals = by_category(c.cells())
+    assert totals == {1: 48000, 2: 15000, 3: 20000}
+    top, rest = top_n(totals, 2)
+    assert top == [(1, 48000), (3, 20000)]
+    assert rest == 15000
+    assert top_n({}, 5) == ([], 0)
+
+
+def test_month_trend(c):
+    trend = month_trend(c, (2026, 3), months=2)
+    assert trend == [
+        ((2026, 2), 900000, 25000, -50),
+        ((2026, 3), 0, 8000, -68),
+    ]
+
+
+def test_breakdown(c, monkeypatch):
+    monkeypatch.setattr(cube, "_cube", c)
+    result = cube.breakdown("month", month="2026-02", version=3, n=1)
+    assert result["categories"] == [(3, 20000)]
+    assert result["other"] == 5000
+    assert result["total_out"] == 25000
+    assert result["trend"][-1][0] == (2026, 2)
+
+
+def test_record_insert_only_one_version_behind(c, monkeypatch):
+    monkeypatch.setattr(cube, "_cube", c)
+    cube.record_insert(4, date(2026, 3, 2), "out", "pribadi", 1, 2000)
+    assert c.version == 4
+    assert c.cells(date(2026, 3, 2), date(2026, 3, 2))[(1, "out", "pribadi")] == 10000
+    cube.record_delete(6, date(2026, 3, 2), "out", "pribadi", 1, 2000)
+    assert c.version == 4
@@ -0,0 +1,66 @@
+import pytest
+
+import delta_sync
+from delta_sync import BatchItemError, parse_amount, parse_item
+
+
+def item(**kw):
+    base = {"key": "k-1", "type": "out", "amount": 15000, "category": "🍔 Makan", "date": "2026-02-14"}
+    base.update(kw)
+    return base
+
+
+@pytest.mark.parametrize("value, expected", [
+    (15000, 15000),
+    (15000.0, 15000),
+    ("15000", 15000),
+    ("15.000", 15000),
+    ("Rp 1.500.000", 1500000),
+    ("25,000.00", 25000),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == expected
+
+
+@pytest.mark.parametrize("value", [15000.5, True, None, [15000], "lima ribu"])
+def test_parse_amount_rejects(value):
+    with pytest.raises(BatchItemError):
+        parse_amount(value)
+
+
+def test_parse_item_out(catalogue):
+    key, row = parse_item(item(desc="  nasi padang "))
+    assert key == "k-1"
+    assert row == ("2026-02-14", "🍔 Makan", "nasi padang", 15000, "out", "pribadi")
+
+
+def test_parse_item_float_amount_is_not_scaled(catalogue):
+    # 15000.0 dari JSON dulu jadi 150000 (titik desimal dibuang sebagai pemisah ribuan)
+    _, row = parse_item(item(amount=15000.0))
+    assert row[3] == 15000
+
+
+def test_parse_item_income_forces_category(catalogue):
+    _, row = parse_item(item(type="in", category="🍔 Makan", usage="pribadi"))
+    assert row[1] == delta_sync.INCOME_CATEGORY
+    assert row[5] == "bisnis"
+
+
+@pytest.mark.parametrize("kw, message", [
+    ({"key": ""}, "key"),
+    ({"type": "transfer"}, "tipe"),
+    ({"amount": 0}, "nominal"),
+    ({"amount": -5000}, "nominal"),
+    ({"amount": 1500.5}, "bulat"),
+    ({"date": "14/02/2026"}, "tanggal"),
+    ({"category": "🎮 Game"}, "kategori"),
+    ({"usage": "lainnya"}, "keperluan"),
+])
+def test_parse_item_errors(catalogue, kw, message):
+    with pytest.raises(BatchItemError, match=message):
+        parse_item(item(**kw))
+
+
+def test_parse_item_not_object():
+    with pytest.raises(BatchItemError):
+        parse_item(["k-1", 15000])
@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import forecast
+from forecast import build_series, ewma_level, moving_average, project, recurring, weekly_factors
+
+FIRST = date(2025, 1, 1).toordinal()
+DAYS = 180
+
+
+def day_index(d):
+    return d.toordinal() - FIRST
+
+
+def test_build_series_merges_usage():
+    keys, X = build_series([
+        (FIRST, {(1, "out", "pribadi"): 1000, (1, "out", "bisnis"): 500}),
+        (FIRST + 2, {(4, "in", "bisnis"): 9000}),
+    ], FIRST, 3)
+    assert keys == [(1, "out"), (4, "in")]
+    assert X.tolist() == [[1500, 0, 0], [0, 0, 9000]]
+
+
+def test_moving_average_and_ewma():
+    X = np.array([[1.0, 2, 3, 4, 5]])
+    assert moving_average(X, 2).tolist() == [[1.5, 2.5, 3.5, 4.5]]
+    assert ewma_level(np.full((1, 60), 7.0))[0] == pytest.approx(7.0)
+
+
+def test_recurring_monthly_bill():
+    # Tagihan 150.000 tiap tanggal 5, ditambah jajan tanggal acak
+    X = np.zeros((1, DAYS))
+    for m in range(1, 7):
+        X[0, day_index(date(2025, m, 5))] = 150000
+    X[0, day_index(date(2025, 2, 20))] = 30000
+    dow, dom, month = forecast._calendar(FIRST, DAYS)
+
+    mask, amount = recurring(X, dom, month)
+    assert mask[0].nonzero()[0].tolist() == [4]
+    assert amount[0, 4] == 150000
+
+
+def test_weekly_factors_follow_weekday_pattern():
+    # Harian 10.000, Sabtu 40.000
+    X = np.full((1, DAYS), 10000.0)
+    saturdays = [i for i in range(DAYS) if date.fromordinal(FIRST + i).weekday() == 5]
+    X[0, saturdays] = 40000
+    dow, _, _ = forecast._calendar(FIRST, DAYS)
+
+    factors = weekly_factors(X, dow)[0]
+    assert factors.mean() == pytest.approx(1)
+    saturday_dow = (FIRST + saturdays[0]) % 7
+    assert factors[saturday_dow] == factors.max()
+    assert factors[saturday_dow] > 2
+
+
+def test_project_flat_daily_series():
+    X = np.full((1, DAYS), 10000.0)
+    F = project(X, FIRST, 30)
+    assert F.shape == (1, 30)
+    assert F == pytest.approx(np.full((1, 30), 10000.0))
+
+
+def test_project_repeats_monthly_bill():
+    X = np.zeros((1, DAYS))
+    for m in range(1, 7):
+        X[0, day_index(date(2025, m, 5))] = 150000
+    F = project(X, FIRST, 60)[0]
+    start = date.fromordinal(FIRST + DAYS)
+    bills = [start + timedelta(days=int(i)) for i in np.nonzero(F > 1000)[0]]
+    assert [d.day for d in bills] == [5, 5]
+    assert F.sum() == pytest.approx(300000)
+
+
+def test_projection_balance_path(monkeypatch):
+    today = date(2025, 7, 1)
+    first = today.toordinal() - DAYS
+    day_cells = [(o, {(1, "out", "pribadi"): 10000, (4, "in", "bisnis"): 25000})
+                 for o in range(first, today.toordinal())]
+    monkeypatch.setattr(forecast.cube, "daily_cells", lambda start, end, version=None: day_cells)
+    monkeypatch.setattr(forecast, "_cached", (None, None))
+
+    rows = forecast.projection(1000000, version=1, today=today)
+    assert [h for h, *_ in rows] == list(forecast.HORIZONS)
+    h, balance, tin, tout = rows[0]
+    assert tin == pytest.approx(25000 * h)
+    assert tout == pytest.approx(10000 * h)
+    assert balance == pytest.approx(1000000 + 15000 * h)
+
+
+def test_projection_without_history(monkeypatch):
+    monkeypatch.setattr(forecast.cube, "daily_cells", lambda start, end, version=None: [])
+    monkeypatch.setattr(forecast, "_cached", (None, None))
+    assert forecast.projection(0, version=1, today=date(2025, 7, 1)) is None
@@ -0,0 +1,102 @@
+import io
+
+import pytest
+
+from importer import (
+    INCOME_CATEGORY, CategoryMatcher, ImportRowError, _parse_amount, content_hash, parse_rows,
+)
+
+NAMES = ["🛍️ Belanja", "🍔 Makan", INCOME_CATEGORY]
+IDS = {name: cid for cid, name in enumerate(NAMES, start=1)}
+
+
+def matcher(default=None):
+    return CategoryMatcher(NAMES, default=default, ids=IDS)
+
+
+def rows(text, default=None):
+    return list(parse_rows(io.StringIO(text), matcher(default), "Sisil"))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1500000", 1500000),
+    ("1.500.000", 1500000),
+    ("Rp 1.500.000", 1500000),
+    ("-25,000.00", -25000),
+    ("(7.500)", -7500),
+    ("", 0),
+    (None, 0),
+])
+def test_parse_amount(value, expected):
+    assert _parse_amount(value) == expected
+
+
+def test_parse_amount_rejects_text():
+    with pytest.raises(ImportRowError, match="nominal"):
+        _parse_amount("seribu")
+
+
+def test_matcher_ignores_case_and_emoji():
+    m = matcher()
+    assert m.match("🍔 Makan") == "🍔 Makan"
+    assert m.match("makan") == "🍔 Makan"
+    assert m.match("BELANJA") == "🛍️ Belanja"
+    with pytest.raises(ImportRowError, match="kategori"):
+        m.match("game")
+    assert matcher(default="🛍️ Belanja").match("game") == "🛍️ Belanja"
+
+
+def test_parse_rows_signed_amount():
+    (line, out), (_, income) = rows(
+        "tanggal,nominal,kategori,keterangan\n"
+        "14/02/2026,-15.000,makan, nasi padang \n"
+        "15/02/2026,2.000.000,,gaji\n"
+    )
+    assert line == 2
+    assert out[:7] == ("2026-02-14", 2, "nasi padang", 15000, "out", "pribadi", "Sisil")
+    # Pemasukan selalu Income/bisnis, kategori di file diabaikan
+    assert income[1:6] == (IDS[INCOME_CATEGORY], "gaji", 2000000, "in", "bisnis")
+
+
+def test_parse_rows_debit_credit():
+    [(_, row)] = rows("date,debit,credit,category\n2026-02-14,25000,,belanja\n")
+    assert row[1] == 1
+    assert row[3:5] == (25000, "out")
+
+
+def test_parse_rows_reports_bad_lines():
+    result = rows(
+        "date,amount,category,usage\n"
+        "2026-02-30,-5000,makan,pribadi\n"
+        "2026-02-14,0,makan,pribadi\n"
+        "2026-02-14,-5000,makan,lainnya\n"
+    )
+    assert [line for line, _ in result] == [2, 3, 4]
+    assert all(isinstance(e, ImportRowError) for _, e in result)
+
+
+def test_parse_rows_requires_date_and_amount():
+    with pytest.raises(ImportRowError, match="header"):
+        rows("keterangan,kategori\nnasi,makan\n")
+
+
+def test_parse_rows_hash_matches_content_hash():
+    [(_, row)] = rows("date,amount,category,desc\n2026-02-14,-15000,makan,nasi\n")
+    assert row[7] == content_hash("2026-02-14", 15000, "out", "pribadi", 2, "nasi")
+
+
+def test_content_hash_trims_like_sql():
+    # TRIM() MySQL hanya membuang spasi; backfill (CONTENT_HASH_SQL) dan import harus sama
+    base = content_hash("2026-02-14", 15000, "out", "pribadi", 2, "nasi")
+    assert content_hash("2026-02-14", 15000, "out", "pribadi", 2, "nasi\t") != base
+    [(_, row)] = rows('date,amount,category,desc\n2026-02-14,-15000,makan,"nasi\t"\n')
+    assert row[2] == "nasi\t"
+    assert row[7] == content_hash("2026-02-14", 15000, "out", "pribadi", 2, "nasi\t")
+
+
+def test_content_hash_uses_category_id():
+    base = content_hash("2026-02-14", 15000, "out", "pribadi", 2, "nasi")
+    # Keterangan dibandingkan setelah strip; kategori lewat id, jadi rename tidak mengubah hash
+    assert content_hash("2026-02-14", 15000, "out", "pribadi", 2, " nasi ") == base
+    assert content_hash("2026-02-14", 15000, "out", "pribadi", 1, "nasi") != base
+    assert content_hash("2026-02-14", 15000, "out", "pribadi", None, "nasi") != base
@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import prefix_index
+from prefix_index import PrefixSumIndex
+
+D1, D2, D4 = date(2026, 2, 1), date(2026, 2, 2), date(2026, 2, 4)
+
+
+@pytest.fixture
+def idx():
+    # (date, in, out, pribadi, bisnis) seperti hasil _load(); 3 Feb tidak ada transaksi
+    return PrefixSumIndex.from_daily_rows([
+        (D1, Decimal("100000.00"), Decimal("30000.00"), Decimal("20000.00"), Decimal("10000.00")),
+        (D2, 0, Decimal("5000.00"), Decimal("5000.00"), 0),
+        (D4, Decimal("50000.00"), 0, 0, 0),
+    ], version=7)
+
+
+def test_range_totals(idx):
+    assert idx.range_totals() == (150000, 35000, 25000, 10000)
+    assert idx.range_totals(D2, D2) == (0, 5000, 5000, 0)
+    assert idx.range_totals(date(2026, 2, 3), date(2026, 2, 3)) == (0, 0, 0, 0)
+    assert idx.range_totals("2026-02-02", "2026-02-04") == (50000, 5000, 5000, 0)
+
+
+def test_range_outside_index(idx):
+    assert idx.range_totals(date(2026, 1, 1), date(2026, 1, 31)) == (0, 0, 0, 0)
+    assert idx.range_totals(date(2026, 1, 1), date(2026, 12, 31)) == idx.range_totals()
+    assert idx.range_totals(D4, D1) == (0, 0, 0, 0)
+
+
+def test_add_and_remove(idx):
+    idx.add(D2, "out", "bisnis", 2500)
+    assert idx.range_totals(D2, D2) == (0, 7500, 5000, 2500)
+    assert idx.range_totals(D4, D4) == (50000, 0, 0, 0)
+    idx.remove(D2, "out", "bisnis", 2500)
+    assert idx.range_totals() == (150000, 35000, 25000, 10000)
+
+
+def test_add_before_base_and_after_end(idx):
+    idx.add(date(2026, 1, 30), "in", "bisnis", 1000)
+    idx.add(date(2026, 2, 10), "out", "pribadi", 400)
+    assert idx.range_totals() == (151000, 35400, 25400, 10000)
+    assert idx.range_totals(D1, D4) == (150000, 35000, 25000, 10000)
+
+
+def test_empty_index():
+    idx = PrefixSumIndex()
+    assert idx.range_totals() == (0, 0, 0, 0)
+    idx.add(D1, "in", "bisnis", 1000)
+    assert idx.range_totals(D1, D1) == (1000, 0, 0, 0)
+
+
+@pytest.fixture
+def worker_index(idx, monkeypatch):
+    monkeypatch.setattr(prefix_index, "_index", idx)
+    return idx
+
+
+def test_fetch_stats_indexed_is_int(worker_index):
+    totals = prefix_index.fetch_stats_indexed("range", "2026-02-01", "2026-02-02", version=7)
+    assert totals == (65000, 100000, 35000, 25000, 10000)
+    assert all(type(v) is int for v in totals)
+    assert prefix_index.fetch_stats_indexed("single", version=7) == (0, 0, 0, 0, 0)
+
+
+def test_dashboard_totals(worker_index):
+    assert prefix_index.dashboard_totals(D4, version=7) == (115000, 50000, 0)
+
+
+def test_record_insert_only_one_version_behind(worker_index):
+    prefix_index.record_insert(8, D4, "out", "pribadi", 1000)
+    assert worker_index.version == 8
+    assert worker_index.range_totals(D4, D4) == (50000, 1000, 1000, 0)
+
+    # Worker lain menulis versi 9: index dibiarkan supaya get_index() membangun ulang
+    prefix_index.record_insert(10, D4, "out", "pribadi", 1000)
+    assert worker_index.version == 8
+    assert worker_index.range_totals(D4, D4) == (50000, 1000, 1000, 0)
@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+import change_log
+import sheets_sync
+from sheets_sync import FakeSheet, RateLimited, SheetsSync, with_backoff
+
+
+def txn(tid):
+    # Urut kolom SELECT di read_changes()
+    return (tid, date(2026, 2, 14), 2, f"t{tid}", 15000, "out", "pribadi", "Sisil")
+
+
+@pytest.fixture
+def feed(monkeypatch, catalogue):
+    """
+    Checkpoint di memori dan read_changes() dari antrian: feed["rounds"]
+    berisi (inserts, deletes, base_version) untuk tiap putaran.
+    """
+    state = {"checkpoint": (0, 0), "saved": [], "rounds": []}
+
+    def read_changes(last_id, last_version):
+        return state["rounds"].pop(0) if state["rounds"] else ([], [], last_version)
+
+    def save_checkpoint(last_id, last_version):
+        state["checkpoint"] = (last_id, last_version)
+        state["saved"].append((last_id, last_version))
+
+    monkeypatch.setattr(sheets_sync, "load_checkpoint", lambda: state["checkpoint"])
+    monkeypatch.setattr(sheets_sync, "save_checkpoint", save_checkpoint)
+    monkeypatch.setattr(sheets_sync, "read_changes", read_changes)
+    return state
+
+
+def ids_in(sheet):
+    return [r[0] for r in sheet.rows]
+
+
+def test_run_once_appends_in_one_call(feed):
+    sheet = FakeSheet()
+    feed["rounds"] = [([txn(1), txn(2)], [], 0)]
+
+    assert SheetsSync(sheet).run_once() == 2
+    assert ids_in(sheet) == ["id", "1", "2"]
+    assert sheet.rows[1] == ["1", "2026-02-14", "🍔 Makan", "t1", 15000, "out", "pribadi", "Sisil"]
+    assert sheet.calls == [("append_rows", 1), ("append_rows", 2)]
+    assert feed["checkpoint"] == (2, 0)
+
+
+def test_run_once_coalesces_appends_and_deletes(feed):
+    sheet = FakeSheet()
+    sync = SheetsSync(sheet)
+    feed["rounds"] = [([txn(1)], [], 0)]
+    sync.run_once()
+
+    # Id 2 ditambah lalu dihapus sebelum terkirim: tidak pernah di-append.
+    # Id 1 sudah di sheet: barisnya dikosongkan lewat satu batch_update.
+    feed["rounds"] = [([txn(2), txn(3)], [(5, 2), (6, 1)], 0)]
+    assert sync.run_once() == 4
+    assert ids_in(sheet) == ["id", "", "3"]
+    assert sheet.calls[-2:] == [("append_rows", 1), ("batch_update", 1)]
+    assert feed["checkpoint"] == (3, 6)
+
+
+def test_run_once_skips_rows_already_in_sheet(feed):
+    # Crash setelah append tapi sebelum checkpoint: id yang sudah ada tidak dikirim ulang
+    sheet = FakeSheet()
+    sheet.rows = [list(sheets_sync.HEADER), ["1", "2026-02-14", "", "", 1, "out", "", ""]]
+    feed["rounds"] = [([txn(1), txn(2)], [], 0)]
+
+    SheetsSync(sheet).run_once()
+    assert ids_in(sheet) == ["id", "1", "2"]
+    assert sheet.calls == [("append_rows", 1)]
+
+
+def test_run_once_nothing_to_do(feed):
+    sheet = FakeSheet()
+    sync = SheetsSync(sheet)
+    sync.run_once()
+    assert feed["saved"] == []
+
+    # Change log terpotong kompaksi untuk sheet baru: checkpoint maju ke horizon
+    feed["rounds"] = [([], [], 9)]
+    assert sync.run_once() == 0
+    assert feed["saved"] == [(0, 9)]
+
+
+def test_run_once_retries_rate_limit(feed):
+    sleeps = []
+    sheet = FakeSheet(fail_times=2)
+    feed["rounds"] = [([txn(1)], [], 0)]
+
+    assert SheetsSync(sheet, sleep=sleeps.append).run_once() == 1
+    assert ids_in(sheet) == ["id", "1"]
+    # Backoff 1s lalu 2s, masing-masing dengan jitter 50-100%
+    assert len(sleeps) == 2
+    assert 0.5 <= sleeps[0] <= 1.0
+    assert 1.0 <= sleeps[1] <= 2.0
+
+
+def test_run_once_keeps_checkpoint_when_push_fails(feed):
+    sheet = FakeSheet()
+    sync = SheetsSync(sheet, sleep=lambda s: None)
+    sync.run_once()
+    sheet.fail_times = sheets_sync.MAX_RETRIES + 1
+    feed["rounds"] = [([txn(1)], [], 0)]
+
+    with pytest.raises(RateLimited):
+        sync.run_once()
+    assert feed["saved"] == []
+
+
+def test_with_backoff_does_not_retry_other_errors():
+    calls = []
+
+    def boom():
+        calls.append(1)
+        raise ValueError("bukan 429")
+
+    with pytest.raises(ValueError):
+        with_backoff(boom, sleep=lambda s: pytest.fail("tidak boleh sleep"))
+    assert calls == [1]
+
+
+# ==========================================
+# read_changes: DELETE YANG DITAHAN
+# ==========================================
+@pytest.fixture
+def change_source(monkeypatch):
+    """read_changes() dengan tabel transactions dan ledger_changes palsu."""
+    src = {"inserts": [], "deletes": [], "horizon": None}
+
+    class Cursor:
+        def execute(self, sql, params):
+            last_id, limit = params
+            self.rows = [r for r in src["inserts"] if r[0] > last_id][:limit]
+
+        def fetchall(self):
+            return self.rows
+
+    @contextmanager
+    def db_cursor(dictionary=False, commit=False):
+        yield Cursor()
+
+    def read_since(since, limit, entity=None, op=None):
+        if src["horizon"] is not None and since < src["horizon"]:
+            raise change_log.ChangesExpired(since, src["horizon"])
+        changes = [change_log.Change(i, v, entity, op, str(tid), None, None)
+                   for i, (v, tid) in enumerate(src["deletes"]) if v > since]
+        return changes, changes[-1].version if changes else since
+
+    monkeypatch.setattr(sheets_sync, "db_cursor", db_cursor)
+    monkeypatch.setattr(sheets_sync.change_log, "read_since", read_since)
+    return src
+
+
+def test_read_changes_holds_delete_of_unread_insert(change_source):
+    change_source["inserts"] = [txn(1), txn(2), txn(3)]
+    change_source["deletes"] = [(4, 1), (5, 3), (6, 2)]
+
+    # Batch penuh (limit 2): id 3 belum terbaca, jadi delete-nya (versi 5)
+    # dan semua sesudahnya ditahan ke putaran berikut
+    inserts, deletes, base = sheets_sync.read_changes(0, 0, limit=2)
+    assert [r[0] for r in inserts] == [1, 2]
+    assert deletes == [(4, 1)]
+    assert base == 0
+
+    inserts, deletes, _ = sheets_sync.read_changes(2, 4, limit=2)
+    assert [r[0] for r in inserts] == [3]
+    assert deletes == [(5, 3), (6, 2)]
+
+
+def test_read_changes_expired_log(change_source):
+    change_source["deletes"] = [(8, 1)]
+    change_source["horizon"] = 7
+
+    # Sheet baru: mulai dari horizon
+    assert sheets_sync.read_changes(0, 0) == ([], [(8, 1)], 7)
+    # Sheet yang sudah berisi: harus dibangun ulang
+    with pytest.raises(change_log.ChangesExpired):
+        sheets_sync.read_changes(5, 0)
+
+
+def test_run_once_with_held_delete(monkeypatch, change_source, catalogue):
+    change_source["inserts"] = [txn(1), txn(2), txn(3)]
+    change_source["deletes"] = [(4, 1), (5, 3)]
+    checkpoint = {"value": (0, 0)}
+    read_changes = sheets_sync.read_changes
+    monkeypatch.setattr(sheets_sync, "read_changes", lambda last_id, last_version: read_changes(last_id, last_version, 2))
+    monkeypatch.setattr(sheets_sync, "load_checkpoint", lambda: checkpoint["value"])
+    monkeypatch.setattr(sheets_sync, "save_checkpoint",
+                        lambda last_id, last_version: checkpoint.update(value=(last_id, last_version)))
+
+    sheet = FakeSheet()
+    sync = SheetsSync(sheet)
+    # Putaran 1: id 1 ditambah dan dihapus di batch yang sama; delete id 3 ditahan
+    assert sync.run_once() == 3
+    assert ids_in(sheet) == ["id", "2"]
+    assert checkpoint["value"] == (2, 4)
+
+    # Putaran 2: insert dan delete id 3 terbaca bersama, tidak ada baris yang muncul lagi
+    assert sync.run_once() == 2
+    assert ids_in(sheet) == ["id", "2"]
+    assert checkpoint["value"] == (3, 5)
+    assert sheet.calls == [("append_rows", 1), ("append_rows", 1)]
@@ -0,0 +1,128 @@
+"""
+Data user di MySQL (tabel users) dengan cache read-through per proses.
+
+Tabelnya kecil, jadi cache memuat semua user sekaligus. Validitasnya dicek
+lewat satu angka versi (cache_versions.name = 'users'): setiap perubahan
+profil menaikkan angka itu di transaksi yang sama, dan worker/node lain
+memuat ulang saat melihat versi baru. Dalam satu request versi dicek
+paling banyak sekali.
+
+PIN disimpan sebagai hash (werkzeug.security), tidak pernah plaintext.
+"""
+import threading
+
+from flask import g, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from db import db_cursor
+from ledger import bump_cache_version, cache_version
+
+VERSION_KEY = "users"
+
+# Isi awal tabel (migrasi 0010), sama dengan dict USERS lama di main.py
+SEED_USERS = [
+    {"user_key": "silviapasya", "username": "silviapasya", "pin": "080599", "name": "Sisil", "gender": "female"},
+    {"user_key": "rdfarizi", "username": "rdfarizi", "pin": "028465", "name": "Fariz", "gender": "male"},
+]
+
+_COLUMNS = "user_key, username, pin_hash, name, gender, avatar_file"
+
+
+def seed_sql(cur):
+    cur.executemany("""
+        INSERT INTO users (user_key, username, pin_hash, name, gender)
+        VALUES (%s, %s, %s, %s, %s)
+    """, [(u["user_key"], u["username"], generate_password_hash(u["pin"]), u["name"], u["gender"])
+          for u in SEED_USERS])
+
+
+class UserStore:
+    def __init__(self):
+        self.version = None
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        # Cukup sekali per request; di luar request (CLI) selalu cek
+        if has_app_context():
+            if g.get("_users_checked"):
+                return
+            g._users_checked = True
+
+        # Versi yang sudah dibaca bersama ETag (ledger.conditional_get) tidak perlu query lagi
+        version = g.get("cache_versions", {}).get(VERSION_KEY) if has_app_context() else None
+        if version is None:
+            with db_cursor() as cur:
+                version = cache_version(cur, VERSION_KEY)
+        if version == self.version:
+            return
+        with db_cursor(dictionary=True) as cur:
+            cur.execute(f"SELECT {_COLUMNS} FROM users")
+            rows = cur.fetchall()
+
+        with self._lock:
+            self._by_key = {r["user_key"]: r for r in rows}
+            self.version = version
+
+    def _public(self, row):
+        # Salinan tanpa hash PIN: aman dimodifikasi dan dikirim ke template
+        return {k: v for k, v in row.items() if k != "pin_hash"}
+
+    # --------------------------
+    # BACA
+    # --------------------------
+    def get(self, user_key):
+        self._sync()
+        row = self._by_key.get(user_key)
+        return self._public(row) if row else None
+
+    def authenticate(self, username, pin):
+        """(user, error): error 'username' / 'pin' kalau gagal."""
+        self._sync()
+        row = next((r for r in self._by_key.values() if r["username"] == username), None)
+        if row is None:
+            return None, "username"
+        if not pin or not check_password_hash(row["pin_hash"], pin):
+            return None, "pin"
+        return self._public(row), None
+
+    def check_pin(self, user_key, pin):
+        self._sync()
+        row = self._by_key.get(user_key)
+        return bool(row and pin and check_password_hash(row["pin_hash"], pin))
+
+    # --------------------------
+    # TULIS
+    # --------------------------
+    def update(self, user_key, name=None, pin=None, avatar_file=None):
+        sets, params = [], []
+        if name:
+            sets.append("name = %s")
+            params.append(name)
+        if pin:
+            sets.append("pin_hash = %s")
+            params.append(generate_password_hash(pin))
+        if avatar_file:
+            sets.append("avatar_file = %s")
+            params.append(avatar_file)
+        if not sets:
+            return
+
+        with db_cursor(commit=True) as cur:
+            cur.execute(f"UPDATE users SET {', '.join(sets)} WHERE user_key = %s", (*params, user_key))
+            bump_cache_version(cur, VERSION_KEY)
+
+        # Request ini langsung melihat perubahan sendiri
+        if has_app_context():
+            g.pop("_users_checked", None)
+            g.get("cache_versions", {}).pop(VERSION_KEY, None)
+
+    def stats(self):
+        return {"users": len(self._by_key), "version": self.version}
+
+
+_store = UserStore()
+
+
+def get_store():
+    return _store